@@ -0,0 +1,29 @@
+# Run many searches on one map over a pool of processes with jps_many
+from jps import *
+import random, time
+
+if __name__ == '__main__':
+    set_visual(False)
+
+    raw_field = [[random.randint(0, 100) for i in range(150)] for j in range(200)]
+    grid = Grid(generate_field(raw_field, (lambda cell: cell > 5), True))
+    pairs = [((random.randint(1, 198), random.randint(1, 148)), (random.randint(1, 198), random.randint(1, 148)))
+             for i in range(200)]
+
+    for workers in (1, 4):
+        t = time.time()
+        results = list(jps_many(grid, pairs, workers=workers))
+        print(workers, "workers took", time.time() - t, "for", len(results), "searches;",
+              sum(1 for pair, path in results if path == []), "had no path")
+
+    # the component labels and landmarks go to the workers too, so they reject unreachable pairs without searching
+    try:
+        grid.label_components()
+        grid.preprocess_landmarks(4)
+    except ImportError as err:
+        print("You don't have numpy. Not checking labelled grids. ", err)
+    else:
+        t = time.time()
+        labelled = list(jps_many(grid, pairs, workers=4))
+        print("4 workers took", time.time() - t, "with component labels and landmarks")
+        assert [len(get_full_path(path)) for pair, path in labelled] == [len(get_full_path(path)) for pair, path in results]
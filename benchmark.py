@@ -0,0 +1,274 @@
+# Benchmark jps on maps and scenarios in the Moving AI benchmark format (https://movingai.com/benchmarks/formats.html)
+#
+#   python benchmark.py --generate bench            write some synthetic maps and scenarios to bench/ and run them
+#   python benchmark.py bench/*.scen maps/*.scen    run existing scenario files
+#   python benchmark.py ... --output results.json   write the results to a file instead of printing them
+#
+# Each scenario is searched with every available mode. For each map and mode, the JSON results have the
+# per-query latency percentiles, the number of jump points expanded (also as a fraction of what 'scan' expanded),
+# how many paths were longer than a plain A* search found (or missing), and the peak memory allocated while searching.
+#
+# Note: Moving AI scenarios give octile optimal lengths for movement without corner cutting. jps moves diagonally
+# at a cost of 1 and can cut corners, so that column is ignored and every query is checked against plain A* instead.
+
+from __future__ import print_function
+
+import argparse, glob, heapq, json, os, platform, random, sys, time, tracemalloc
+from collections import OrderedDict
+
+from jps import *
+
+PASSABLE = '.GS'   # terrain that can be walked on. Trees (T), water (W) and out of bounds (@, O) can't.
+
+MODES = OrderedDict([
+    ('scan', {}),
+    ('scan-unpruned', {'prune': False}),
+    ('jps+', {'mode': 'jps+'}),
+    ('bitset', {'mode': 'bitset'}),
+    ('landmarks', {'landmarks': 8}),
+    ('bucket-queue', {'queue': 'bucket'}),
+    ('bidirectional', {'bidirectional': True}),
+])
+
+def load_map(path):
+    """ Read a .map file into a field like generate_field(...) makes, indexed [x][y]. """
+    with open(path) as f:
+        header = {}
+        for line in f:
+            line = line.strip()
+            if line == 'map':
+                break
+            key, value = line.split(None, 1)
+            header[key] = value
+        width, height = int(header['width']), int(header['height'])
+        rows = [f.readline().rstrip('\r\n') for y in range(height)]
+    return [[UNINITIALIZED if rows[y][x] in PASSABLE else OBSTACLE for y in range(height)] for x in range(width)]
+
+def load_scenarios(path):
+    """
+    Read a .scen file.
+
+    Return
+    a list of (map path, start x, start y, goal x, goal y). Map paths are resolved relative to the .scen file.
+    """
+    result = []
+    with open(path) as f:
+        for line in f:
+            parts = line.rstrip('\r\n').split('\t')
+            if len(parts) < 8:
+                continue  # the version line
+            map_path = os.path.join(os.path.dirname(path), parts[1])
+            if not os.path.exists(map_path):
+                map_path = os.path.join(os.path.dirname(path), os.path.basename(parts[1]))
+            result.append((map_path,) + tuple(int(n) for n in parts[4:8]))
+    return result
+
+def write_map(path, field):
+    width, height = len(field), len(field[0])
+    with open(path, 'w') as f:
+        f.write('type octile\nheight {}\nwidth {}\nmap\n'.format(height, width))
+        for y in range(height):
+            f.write(''.join('@' if field[x][y] == OBSTACLE else '.' for x in range(width)) + '\n')
+
+def write_scenarios(path, map_name, field, queries):
+    """ queries is a list of (start x, start y, goal x, goal y, length). """
+    width, height = len(field), len(field[0])
+    with open(path, 'w') as f:
+        f.write('version 1\n')
+        for sx, sy, gx, gy, length in queries:
+            f.write('\t'.join(str(n) for n in (length // 4, map_name, width, height, sx, sy, gx, gy, length)) + '\n')
+
+def generate(directory, seed=1, size=256, count=100):
+    """
+    Write some synthetic maps, each with a .scen file of count queries between connected cells.
+    Their optimal length column holds the length of the path with jps's movement rules.
+
+    Return
+    the paths of the .scen files
+    """
+    rng = random.Random(seed)
+    maps = OrderedDict()
+
+    # scattered obstacles
+    maps['random20'] = generate_field([[rng.randint(0, 100) for y in range(size)] for x in range(size)], (lambda cell: cell > 20))
+
+    # 16x16 rooms joined by doors
+    rooms = [[OBSTACLE if x % 16 == 0 or y % 16 == 0 else UNINITIALIZED for y in range(size)] for x in range(size)]
+    for x in range(0, size - 16, 16):
+        for y in range(0, size - 16, 16):
+            door = rng.randint(y + 2, y + 13)
+            rooms[x + 16][door] = rooms[x + 16][door + 1] = UNINITIALIZED
+            door = rng.randint(x + 2, x + 13)
+            rooms[door][y + 16] = rooms[door + 1][y + 16] = UNINITIALIZED
+    maps['rooms16'] = rooms
+
+    # a maze of corridors 3 cells wide, carved by a random depth-first walk
+    cells = size // 4
+    maze = [[OBSTACLE] * size for x in range(size)]
+    stack, seen = [(0, 0)], set([(0, 0)])
+    while stack:
+        cx, cy = stack[-1]
+        options = [(cx + dx, cy + dy) for dx, dy in DIRECTIONS[:4]
+                   if 0 <= cx + dx < cells and 0 <= cy + dy < cells and (cx + dx, cy + dy) not in seen]
+        if not options:
+            stack.pop()
+            continue
+        nx, ny = rng.choice(options)
+        seen.add((nx, ny))
+        stack.append((nx, ny))
+        for x in range(min(cx, nx) * 4 + 1, max(cx, nx) * 4 + 4):
+            for y in range(min(cy, ny) * 4 + 1, max(cy, ny) * 4 + 4):
+                maze[x][y] = UNINITIALIZED
+    maps['maze4'] = maze
+
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    result = []
+    for name, field in maps.items():
+        write_map(os.path.join(directory, name + '.map'), field)
+        grid = Grid(field)
+        walkable = [i for i in range(grid.width * grid.height) if grid.walkable[i]]
+        queries = []
+        while len(queries) < count:
+            (sx, sy), (gx, gy) = grid.coords(rng.choice(walkable)), grid.coords(rng.choice(walkable))
+            length = astar(grid, sx, sy, gx, gy)
+            if length is not None:
+                queries.append((sx, sy, gx, gy, length))
+        path = os.path.join(directory, name + '.map.scen')
+        write_scenarios(path, name + '.map', field, queries)
+        result.append(path)
+    return result
+
+def astar(grid, start_x, start_y, end_x, end_y):
+    """ The reference: a plain A* over every cell of grid. Return the length of the shortest path, or None. """
+    height, walkable = grid.height, grid.walkable
+    start, end = grid.index(start_x, start_y), grid.index(end_x, end_y)
+    cost = {start: 0}
+    pq = [(max(abs(start_x - end_x), abs(start_y - end_y)), start)]
+    while pq:
+        f, p = heapq.heappop(pq)
+        if p == end:
+            return cost[p]
+        x, y = divmod(p, height)
+        if f > cost[p] + max(abs(x - end_x), abs(y - end_y)):
+            continue  # stale
+        for dx, dy in DIRECTIONS:
+            nx, ny = x + dx, y + dy
+            if 0 <= nx < grid.width and 0 <= ny < height and walkable[nx * height + ny]:
+                n = nx * height + ny
+                if cost[p] + 1 < cost.get(n, cost[p] + 2):
+                    cost[n] = cost[p] + 1
+                    heapq.heappush(pq, (cost[n] + max(abs(nx - end_x), abs(ny - end_y)), n))
+    return None
+
+def run_mode(field, queries, references, options):
+    """ Search every query on field with one mode. Return a dict of its results for the JSON. """
+    result = OrderedDict()
+    options = dict(options)
+    landmarks = options.pop('landmarks', None)   # a Grid setting rather than an option of jps(...)
+
+    def search(sx, sy, gx, gy, **extra):
+        try:
+            return jps(grid, sx, sy, gx, gy, **dict(options, **extra))
+        except ValueError:
+            return None
+
+    # memory, including the compiled grid and any preprocessing, without a tracer's own arrays counted
+    tracemalloc.start()
+    grid = Grid(field)
+    if options.get('mode') == 'jps+':
+        result['preprocess'] = grid.preprocess_jump_distances()
+    elif options.get('mode') == 'bitset':
+        t = time.perf_counter()
+        grid.build_bitsets()
+        result['preprocess'] = {'seconds': time.perf_counter() - t}
+    if landmarks:
+        result['preprocess'] = grid.preprocess_landmarks(landmarks)
+    for query in queries:
+        search(*query)
+    result['peak_memory_bytes'] = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    # expansions and path lengths
+    tracer = SearchTracer()
+    paths = [search(*query, tracer=tracer) for query in queries]
+    lengths = [len(get_full_path(path)) - 1 if path else None for path in paths]
+
+    # latency, with nothing else running
+    latencies = []
+    for query in queries:
+        t = time.perf_counter()
+        search(*query)
+        latencies.append((time.perf_counter() - t) * 1000)
+
+    result['latency_ms'] = percentiles(latencies)
+    result['expanded'] = OrderedDict([('total', tracer.expanded), ('mean', tracer.expanded / float(len(queries)))])
+    result['scanned'] = tracer.scanned
+    pairs = list(zip(lengths, references))
+    ratios = [length / float(reference) for length, reference in pairs if length is not None and reference]
+    result['optimality'] = OrderedDict([
+        ('optimal', sum(1 for length, reference in pairs if length == reference)),
+        ('suboptimal', sum(1 for length, reference in pairs if None not in (length, reference) and length > reference)),
+        ('missing', sum(1 for length, reference in pairs if length is None and reference is not None)),
+        ('max_cost_ratio', max(ratios) if ratios else None),
+    ])
+    return result
+
+def run(scenario_files, modes, limit=None):
+    """ Run every mode on the queries of each .scen file. Return the results as a dict for the JSON. """
+    results = OrderedDict([('python', platform.python_version()), ('machine', platform.machine()), ('maps', OrderedDict())])
+    for path in scenario_files:
+        scenarios = load_scenarios(path)[:limit]
+        if not scenarios:
+            continue
+        # jps needs a border of obstacles, so the map is padded and every coordinate moves by 1
+        field = load_map(scenarios[0][0])
+        field = [[OBSTACLE] * (len(field[0]) + 2)] + [[OBSTACLE] + column + [OBSTACLE] for column in field] + [[OBSTACLE] * (len(field[0]) + 2)]
+        queries = [tuple(n + 1 for n in s[1:]) for s in scenarios]
+        grid = Grid(field)
+        references = [astar(grid, *q) for q in queries]
+
+        entry = OrderedDict([('map', scenarios[0][0]), ('width', grid.width), ('height', grid.height),
+                             ('queries', len(queries)), ('modes', OrderedDict())])
+        for name in modes:
+            try:
+                entry['modes'][name] = run_mode(field, queries, references, MODES[name])
+            except ImportError as err:
+                entry['modes'][name] = {'skipped': str(err)}
+            print(os.path.basename(path), name, "done", file=sys.stderr)
+        if 'expanded' in entry['modes'].get('scan', {}):
+            for result in entry['modes'].values():
+                if 'expanded' in result:
+                    result['expanded']['vs_scan'] = result['expanded']['total'] / float(entry['modes']['scan']['expanded']['total'] or 1)
+        results['maps'][os.path.basename(path)] = entry
+    return results
+
+if __name__ == '__main__':
+    set_visual(False)
+    parser = argparse.ArgumentParser(description="Benchmark jps on Moving AI .map/.scen scenarios, as JSON.")
+    parser.add_argument('scenarios', nargs='*', help=".scen files, or directories of them")
+    parser.add_argument('--generate', metavar='DIR', help="write synthetic maps and scenarios to DIR and include them")
+    parser.add_argument('--modes', default=','.join(MODES), help="comma-separated modes to run, from: " + ', '.join(MODES))
+    parser.add_argument('--limit', type=int, help="only run the first LIMIT queries of each .scen file")
+    parser.add_argument('--output', help="write the JSON here instead of to stdout")
+    args = parser.parse_args()
+
+    files = []
+    for name in args.scenarios:
+        files.extend(sorted(glob.glob(os.path.join(name, '*.scen'))) if os.path.isdir(name) else [name])
+    if args.generate:
+        files.extend(generate(args.generate))
+    if not files:
+        parser.error("no scenarios: give some .scen files, or --generate DIR")
+
+    modes = args.modes.split(',')
+    for name in modes:
+        if name not in MODES:
+            parser.error("unknown mode: " + name)
+
+    results = run(files, modes, args.limit)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
@@ -0,0 +1,43 @@
+# Bidirectional search: compare jps(..., bidirectional=True) with the normal forward search
+from jps import *
+import random, time
+
+set_visual(False)
+random.seed(4)
+
+def compare(name, grid, queries):
+    for bidirectional in (False, True):
+        t = time.time()
+        for q in queries:
+            jps(grid, *q, bidirectional=bidirectional)
+        seconds = time.time() - t
+        tracer = SearchTracer()
+        for q in queries:
+            jps(grid, *q, bidirectional=bidirectional, tracer=tracer)
+        print(name, "bidirectional" if bidirectional else "forward", "- %.3f seconds," % seconds,
+              tracer.expanded, "jump points expanded,", tracer.scanned, "cells scanned")
+
+# sparse obstacles, with the destination in a walled pocket that opens away from the start
+field = generate_field([[random.randint(0, 100) for i in range(300)] for j in range(300)], (lambda cell: cell > 5), True)
+for y in range(100, 201):
+    field[200][y] = OBSTACLE
+for x in range(200, 260):
+    field[x][100] = field[x][200] = OBSTACLE
+for x in range(201, 259):
+    for y in range(101, 200):
+        field[x][y] = UNINITIALIZED
+grid = Grid(field)
+compare("into a pocket", grid, [(20, 150, 230, 150)])
+compare("out of a pocket", grid, [(230, 150, 20, 150)])
+
+# random queries on a map of 20x20 rooms joined by doors
+field = [[OBSTACLE if x % 20 == 0 or y % 20 == 0 or x == 399 or y == 399 else UNINITIALIZED for y in range(400)] for x in range(400)]
+for x in range(0, 380, 20):
+    for y in range(0, 380, 20):
+        door = random.randint(y + 2, y + 17)
+        field[x + 20][door] = field[x + 20][door + 1] = UNINITIALIZED
+        door = random.randint(x + 2, x + 17)
+        field[door][y + 20] = field[door + 1][y + 20] = UNINITIALIZED
+grid = Grid(field)
+cells = [grid.coords(i) for i in range(grid.width * grid.height) if grid.walkable[i]]
+compare("rooms", grid, [random.choice(cells) + random.choice(cells) for i in range(20)])
@@ -0,0 +1,61 @@
+# Bitset scanning: compare mode='bitset' with the cell by cell scan, on open rooms and on a cluttered field
+from jps import *
+import random, time
+
+set_visual(False)
+random.seed(9)
+
+def compare(name, grid, queries):
+    t = time.time()
+    grid.build_bitsets()
+    print(name, "- building the bitsets took", time.time() - t)
+    for mode in ('scan', 'bitset'):
+        tracer = SearchTracer()
+        t = time.time()
+        paths = [jps(grid, *q, mode=mode) for q in queries]
+        seconds = time.time() - t
+        for q in queries:
+            jps(grid, *q, mode=mode, tracer=tracer)
+        print(name, mode, "- %.3f seconds," % seconds, tracer.expanded, "jump points expanded,", tracer.scanned, "cells scanned")
+        if mode == 'scan':
+            expected = paths
+        else:
+            assert paths == expected
+
+# large rooms, where most of the time goes into long scans across open floor
+field = [[OBSTACLE if x in (0, 999) or y in (0, 999) or (x % 100 == 0 and y % 7 != 0) else UNINITIALIZED
+          for y in range(1000)] for x in range(1000)]
+for i in range(300):
+    field[random.randint(1, 998)][random.randint(1, 998)] = OBSTACLE
+grid = Grid(field)
+cells = [grid.coords(i) for i in range(grid.width * grid.height) if grid.walkable[i]]
+compare("rooms", grid, [random.choice(cells) + random.choice(cells) for i in range(10)])
+
+# short scans between scattered obstacles, where the bitsets don't save much
+field = generate_field([[random.randint(0, 100) for i in range(600)] for j in range(800)], (lambda cell: cell > 20), True)
+grid = Grid(field)
+try:
+    grid.label_components()
+except ImportError as err:
+    print("You don't have numpy. Finding queries with a path by searching instead. ", err)
+
+def connected(q):
+    if grid.components is not None:
+        return grid.components[grid.index(*q[:2])] == grid.components[grid.index(*q[2:])]
+    try:
+        return bool(jps(grid, *q))
+    except ValueError:
+        return False
+
+cells = [grid.coords(i) for i in range(grid.width * grid.height) if grid.walkable[i]]
+queries = []
+while len(queries) < 10:
+    q = random.choice(cells) + random.choice(cells)
+    if connected(q):
+        queries.append(q)
+compare("cluttered", grid, queries)
+
+# the bitsets follow obstacle edits
+grid.add_obstacle(*cells[0])
+grid.remove_obstacle(*cells[0])
+print("after two edits, jps finds", len(get_full_path(jps(grid, *queries[0], mode='bitset'))) - 1, "steps")
@@ -0,0 +1,38 @@
+# Bounded search: spread one long search over several frames, and walk towards the destination in the meantime
+from jps import *
+import random, time
+
+set_visual(False)
+random.seed(6)
+
+raw_field = [[random.randint(0, 100) for i in range(600)] for j in range(800)]
+field = generate_field(raw_field, (lambda cell: cell > 30), True)
+field[10][10] = field[790][590] = UNINITIALIZED
+grid = Grid(field)
+
+t = time.time()
+whole = jps(grid, 10, 10, 790, 590)
+print("one search took", time.time() - t)
+
+# at most 200 jump points per frame
+search = BoundedSearch(grid, 10, 10, 790, 590)
+frames, slowest = 0, 0
+while True:
+    t = time.time()
+    path, complete = search.run(max_expansions=200)
+    slowest = max(slowest, time.time() - t)
+    frames += 1
+    if complete:
+        break
+    if frames % 50 == 1:
+        print("frame", frames, "- best so far ends at", path[-1])
+print(frames, "frames, the slowest took", slowest, "-", search.expanded, "jump points expanded")
+assert len(get_full_path(path)) == len(get_full_path(whole))
+
+# a time budget of 2 milliseconds for a single query
+path, complete = jps_bounded(grid, 10, 10, 790, 590, deadline=time.time() + 0.002)
+print("with a 2ms deadline: complete =", complete, "- the path ends at", path[-1])
+
+# only paths that cost no more than a straight line
+path, complete = jps_bounded(grid, 10, 10, 790, 590, max_cost=780)
+print("with a max cost of 780: complete =", complete, "- the path ends at", path[-1], "after", len(get_full_path(path)) - 1, "steps")
@@ -0,0 +1,46 @@
+# Compile a map once to a binary file, then open it read-only with almost no startup cost
+from jps import *
+import os, random, shutil, tempfile, time
+
+if __name__ == '__main__':
+    set_visual(False)
+    random.seed(8)
+
+    t = time.time()
+    raw_field = [[random.randint(0, 100) for i in range(1500)] for j in range(2000)]
+    field = generate_field(raw_field, (lambda cell: cell > 20), True)
+    field[10][10] = field[1990][1490] = UNINITIALIZED
+    grid = Grid(field)
+    print("making and compiling the field took", time.time() - t)
+
+    try:
+        grid.preprocess_jump_distances()
+        grid.label_components()
+    except ImportError as err:
+        print("You don't have numpy. Saving the map without its tables. ", err)
+
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'random.grid')
+    try:
+        content_hash = grid.save(path)
+        print("saved", os.path.getsize(path), "bytes to", path, "- hash", content_hash)
+
+        t = time.time()
+        loaded = Grid.load(path)
+        print("loading it took", time.time() - t)
+        assert loaded.content_hash == content_hash
+        mode = 'jps+' if loaded.jump_distances is not None else 'scan'
+
+        t = time.time()
+        found = jps(loaded, 10, 10, 1990, 1490, mode=mode)
+        print("searching it with", mode, "took", time.time() - t)
+        assert found == jps(grid, 10, 10, 1990, 1490, mode=mode)
+
+        # a worker pool can map the same file in every process instead of copying the grid to each of them
+        pairs = [((10, 10), (1990, 1490)), ((1990, 1490), (10, 10))]
+        for pair, result in jps_many(path, pairs, workers=2, mode=mode):
+            print(pair, len(get_full_path(result)) - 1, "steps")
+    finally:
+        # drop the memory-mapped grid before deleting its file
+        loaded = None
+        shutil.rmtree(directory)
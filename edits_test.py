@@ -0,0 +1,87 @@
+# Obstacle edits: after random batches of added and removed obstacles, everything a Grid updates incrementally
+# (JPS+ tables, component labels, cached paths) must match a Grid compiled from scratch, and repaired paths must
+# still be walkable. The tables and labels need numpy; the cache and repair checks run without it.
+from jps import *
+import random
+
+set_visual(False)
+random.seed(14)
+
+width, height = 60, 50
+raw_field = [[random.randint(0, 100) for i in range(height)] for j in range(width)]
+grid = Grid(generate_field(raw_field, (lambda cell: cell > 25), True))
+
+try:
+    grid.preprocess_jump_distances()
+    grid.label_components()
+except ImportError as err:
+    print("You don't have numpy. Only checking the path cache and repair_path. ", err)
+    has_numpy = False
+else:
+    has_numpy = True
+cache = grid.cache_paths(256)
+
+def fresh():
+    """ A Grid compiled from scratch from the current walkability of grid """
+    field = [[UNINITIALIZED if grid.walkable[x * grid.height + y] else OBSTACLE for y in range(grid.height)]
+             for x in range(grid.width)]
+    result = Grid(field)
+    if has_numpy:
+        result.preprocess_jump_distances()
+        result.label_components()
+    return result
+
+def search(g, start, end):
+    try:
+        return jps(g, *(start + end))
+    except ValueError:
+        return []
+
+def same_partition(labels, expected):
+    """ Whether two labellings split the cells into the same components, whatever the numbers are """
+    forward, backward = {}, {}
+    for a, b in zip(labels, expected):
+        if (a == 0) != (b == 0) or forward.setdefault(a, b) != b or backward.setdefault(b, a) != a:
+            return False
+    return True
+
+inside = [(x, y) for x in range(1, grid.width - 1) for y in range(1, grid.height - 1)]
+queries = [(random.choice(inside), random.choice(inside)) for i in range(40)]
+paths = dict((q, search(grid, *q)) for q in queries)
+
+for batch in range(30):
+    # mostly small local edits, like painting in field_gui.py, sometimes undoing earlier ones
+    cx, cy = random.choice(inside)
+    near = [(x, y) for x, y in inside if abs(x - cx) <= 3 and abs(y - cy) <= 3]
+    added = random.sample(near, random.randint(0, 6))
+    removed = random.sample(near, random.randint(0, 6))
+    changed = grid.apply_edits(added=added, removed=removed)
+    expected = fresh()
+
+    if has_numpy:
+        for direction, table, reference in zip(DIRECTIONS, grid.jump_distances, expected.jump_distances):
+            assert list(table) == list(reference), ("JPS+ table", direction, "after batch", batch)
+        assert same_partition(grid.components, expected.components), ("components after batch", batch)
+
+    for q in queries:
+        # cached (or recomputed) paths on the edited grid are as short as a fresh search
+        found, reference = search(grid, *q), search(expected, *q)
+        assert len(get_full_path(found)) == len(get_full_path(reference)), ("cached path", q, "after batch", batch)
+
+        # a repaired path is walkable and still gets to the goal
+        if paths[q]:
+            try:
+                repaired = repair_path(grid, paths[q])
+            except ValueError:
+                assert not reference, ("repair_path gave up on", q, "after batch", batch)
+            else:
+                cells = get_full_path(repaired)
+                assert cells[0] == q[0] and cells[-1] == q[1], ("repaired path ends", q)
+                assert all(grid.is_walkable(x, y) for x, y in cells), ("repaired path blocked", q)
+                assert all(max(abs(a[0] - b[0]), abs(a[1] - b[1])) == 1 for a, b in zip(cells, cells[1:]))
+                paths[q] = repaired
+        else:
+            paths[q] = found
+
+print("30 batches of edits checked:", cache.hits, "cache hits,", cache.invalidations, "paths invalidated")
+assert cache.hits and cache.invalidations
@@ -9,6 +9,7 @@ X_MAX, Y_MAX = 800, 600
 width, height = 100, 50
 
 field = [[jps.UNINITIALIZED for i in range(height)] for j in range(width)]
+grid = jps.Grid(field)  # kept in step with field, so that searches don't have to recompile it
 
 if __name__ == '__main__':
     pygame.init()
@@ -33,6 +34,7 @@ if __name__ == '__main__':
             if 0 <= mousex // 5 < width and 0 <= mousey // 5 < height:
                 print(mousex // 5, mousey // 5)
                 field[mousex // 5][mousey // 5] = jps.OBSTACLE
+                grid.add_obstacle(mousex // 5, mousey // 5)
                 pygame.draw.rect(main_surface, 0xFFFFFF, (mousex // 5 * 5, mousey // 5 * 5, 5, 5))
                 
 
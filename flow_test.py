@@ -0,0 +1,38 @@
+# Flow field: one distance map for hundreds of agents heading to the same place, instead of one search each. Needs numpy.
+from jps import *
+import random, time
+
+set_visual(False)
+random.seed(5)
+
+raw_field = [[random.randint(0, 100) for i in range(600)] for j in range(800)]
+field = generate_field(raw_field, (lambda cell: cell > 20), True)
+field[400][300] = UNINITIALIZED
+grid = Grid(field)
+
+try:
+    grid.label_components()
+    agents = [grid.coords(i) for i in random.sample(range(grid.width * grid.height), 5000)
+              if grid.walkable[i] and grid.components[i] == grid.components[grid.index(400, 300)]][:300]
+    t = time.time()
+    distances, directions = flow_field(grid, 400, 300)
+except ImportError as err:
+    print("You don't have numpy. Cannot run the flow field test. ", err)
+else:
+    print("flow field took", time.time() - t, "-", distances.nbytes + directions.nbytes, "bytes")
+
+    t = time.time()
+    lengths = [len(get_full_path(jps(grid, x, y, 400, 300))) - 1 for x, y in agents]
+    print(len(agents), "searches took", time.time() - t)
+
+    # walk every agent to the destination by looking up its next step
+    t = time.time()
+    for (x, y), length in zip(agents, lengths):
+        assert distances[x, y] == length
+        steps = 0
+        while directions[x, y] >= 0:
+            dx, dy = DIRECTIONS[directions[x, y]]
+            x, y = x + dx, y + dy
+            steps += 1
+        assert (x, y) == (400, 300) and steps == length
+    print("walking", len(agents), "agents along the flow field took", time.time() - t)
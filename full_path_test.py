@@ -0,0 +1,27 @@
+# Ways to get the cells of a path: a list, a generator, a numpy array or straight runs
+from jps import *
+import time, tracemalloc
+
+set_visual(False)
+
+path = [(1, 1), (3000, 1), (3000, 2000), (1000, 4000)]   # jump points of a long path
+
+def measure(name, fcn):
+    tracemalloc.start()
+    t = time.time()
+    fcn()
+    print(name, "took %.4f" % (time.time() - t), "and allocated at most", tracemalloc.get_traced_memory()[1], "bytes")
+    tracemalloc.stop()
+
+measure("get_full_path", lambda: get_full_path(path))
+measure("iter_full_path", lambda: sum(1 for cell in iter_full_path(path)))
+measure("runs", lambda: get_full_path(path, output='runs'))
+try:
+    import numpy   # so that importing it isn't measured
+except ImportError as err:
+    print("You don't have numpy. Cannot make an array. ", err)
+else:
+    measure("numpy array", lambda: get_full_path(path, output='array'))
+
+print(get_full_path(path, output='runs'))
+assert list(iter_full_path(path)) == get_full_path(path)
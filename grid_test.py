@@ -0,0 +1,24 @@
+# Compile a field into a Grid once and search it many times, without pygame
+from jps import *
+import random, time
+
+set_visual(False)
+
+raw_field = [[random.randint(0, 100) for i in range(150)] for j in range(200)]
+field = generate_field(raw_field, (lambda cell: cell > 5), True)
+field[1][1] = UNINITIALIZED
+field[198][148] = UNINITIALIZED
+
+grid = Grid(field)
+assert jps(grid, 1, 1, 198, 148) == jps(field, 1, 1, 198, 148)
+
+t = time.time()
+for i in range(100):
+    jps(grid, 1, 1, 198, 148)
+print("100 searches on a compiled grid took", time.time() - t)
+
+cache = grid.cache_paths()
+t = time.time()
+for i in range(100):
+    jps(grid, 1, 1, 198, 148)
+print("100 searches with a path cache took", time.time() - t, "-", cache.hits, "hits,", cache.misses, "misses")
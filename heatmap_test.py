@@ -0,0 +1,39 @@
+# Headless rendering: a heatmap of the jump points expanded by many searches, written to a PNG without a window
+from jps import *
+import os, random, shutil, tempfile, time
+
+set_visual(False)
+random.seed(13)
+
+raw_field = [[random.randint(0, 100) for i in range(300)] for j in range(400)]
+grid = Grid(generate_field(raw_field, (lambda cell: cell > 20), True))
+try:
+    grid.label_components()   # only to reject the unreachable queries quickly
+except ImportError as err:
+    print("You don't have numpy. Searching without component labels. ", err)
+cells = [grid.coords(i) for i in range(grid.width * grid.height) if grid.walkable[i]]
+
+tracer = SearchTracer()
+t = time.time()
+searched = 0
+while searched < 300:
+    query = random.choice(cells) + random.choice(cells)
+    try:
+        path = jps(grid, *query, tracer=tracer)
+    except ValueError:
+        continue
+    searched += 1
+print(searched, "searches took", time.time() - t, "-", tracer.expanded, "jump points expanded")
+
+directory = tempfile.mkdtemp()
+try:
+    t = time.time()
+    image = render_search(grid, get_full_path(path), tracer, scale=2, heatmap=True)
+    print("rendering took", time.time() - t)
+    filename = os.path.join(directory, 'heatmap.png')
+    save_image(image, filename)
+    print("wrote", filename, "-", os.path.getsize(filename), "bytes")
+except ImportError as err:
+    print("You don't have numpy, or pygame or Pillow. Cannot render the heatmap. ", err)
+finally:
+    shutil.rmtree(directory)
@@ -0,0 +1,266 @@
+########################################################################################
+# HIERARCHICAL PATH-FINDING ON TOP OF JUMP-POINT SEARCH
+#  Described: Botea, Muller & Schaeffer, "Near Optimal Hierarchical Path-Finding" (HPA*), 2004
+#
+# The grid is cut into square clusters. Where two neighbouring clusters touch, the walkable cells on
+# either side of the border are grouped into entrances, and each entrance gets one or two transitions:
+# a pair of cells, one on each side, that are one step apart. jps(...) is then run inside every cluster to
+# find the cost between each pair of its transition cells. That gives a small abstract graph.
+#
+# Using this module:
+#   - build a Hierarchy(...) once for a map.
+#   - use hierarchy.find_path(...) to get a path over the abstract graph. This is fast even for long routes.
+#   - use jps.get_full_path(...) on the result to get every cell. Only then is the path refined into
+#     real jump points, one cluster at a time.
+#
+# Paths are near optimal: inside a cluster they're shortest, but they always cross between clusters
+# at a transition.
+#
+########################################################################################
+
+from __future__ import print_function
+
+import heapq, itertools, time
+
+import jps
+
+class Hierarchy(object):
+    """
+    An abstract graph of cluster transitions over a Grid, for answering long queries quickly.
+    """
+    def __init__(self, field, cluster_size=16, **options):
+        """
+        field        - a Grid, or a field to compile into one. It's assumed not to change.
+        cluster_size - the width and height of each cluster, in cells
+        options      - passed on to jps(...) for the searches inside clusters, e.g. mode='jps+'
+
+        Afterwards stats holds the build time in 'seconds', and the number of abstract 'nodes' and 'edges'.
+        """
+        t = time.time()
+        self.grid = field if isinstance(field, jps.Grid) else jps.Grid(field)
+        self.cluster_size = cluster_size
+        self.options = options
+        self.clusters = {}   # (cluster x, cluster y) -> _Cluster
+        self.edges = {}      # index of a transition cell -> {index of a neighbouring transition cell: cost}
+
+        size = cluster_size
+        for cx in range((self.grid.width + size - 1) // size):
+            for cy in range((self.grid.height + size - 1) // size):
+                self.clusters[cx, cy] = _Cluster(self.grid, cx * size, cy * size,
+                                                 min((cx + 1) * size, self.grid.width), min((cy + 1) * size, self.grid.height))
+        self._find_transitions()
+        for cluster in self.clusters.values():
+            self._connect_inside(cluster)
+
+        self.stats = {'seconds': time.time() - t, 'nodes': len(self.edges),
+                      'edges': sum(len(neighbours) for neighbours in self.edges.values()) // 2}
+
+    def cluster_of(self, x, y):
+        return self.clusters[x // self.cluster_size, y // self.cluster_size]
+
+    def find_path(self, start_x, start_y, end_x, end_y):
+        """
+        Find a path over the abstract graph.
+
+        Return
+        an AbstractPath: a list of waypoints as 2-tuples, from the start to the end. Consecutive waypoints are
+        either one step apart or in the same cluster. Pass it to jps.get_full_path(...) (or call refine()) for the real path.
+        Raises ValueError if there's no path.
+        """
+        grid = self.grid
+        if not grid.is_walkable(start_x, start_y):
+            raise ValueError("No path exists: the start node is not walkable")
+        if not grid.is_walkable(end_x, end_y):
+            raise ValueError("No path exists: the end node is not walkable")
+        start, end = grid.index(start_x, start_y), grid.index(end_x, end_y)
+
+        # connect the start and end to the transitions of their clusters, just for this query
+        extra = {}
+        for cell in (start, end):
+            cluster = self.cluster_of(*grid.coords(cell))
+            for node in cluster.nodes:
+                cost = cluster.cost(cell, node, self.options, remember=False)
+                if cost is not None:
+                    extra.setdefault(cell, {})[node] = cost
+                    extra.setdefault(node, {})[cell] = cost
+        start_cluster, end_cluster = self.cluster_of(start_x, start_y), self.cluster_of(end_x, end_y)
+        if start_cluster is end_cluster:
+            cost = start_cluster.cost(start, end, self.options, remember=False)
+            if cost is not None:
+                extra.setdefault(start, {})[end] = cost
+
+        height = grid.height
+        def h(node):
+            x, y = divmod(node, height)
+            return max(abs(x - end_x), abs(y - end_y))
+
+        # A* over the abstract graph
+        counter = itertools.count()
+        pq = [(h(start), next(counter), start)]
+        cost = {start: 0}
+        sources = {start: None}
+        closed = set()
+        while pq:
+            f, count, node = heapq.heappop(pq)
+            if node in closed:
+                continue
+            closed.add(node)
+            if node == end:
+                result = []
+                while node is not None:
+                    result.append(grid.coords(node))
+                    node = sources[node]
+                result.reverse()
+                return AbstractPath(self, result)
+
+            for neighbours in (self.edges.get(node, {}), extra.get(node, {})):
+                for neighbour, step in neighbours.items():
+                    new_cost = cost[node] + step
+                    if new_cost < cost.get(neighbour, new_cost + 1):
+                        cost[neighbour] = new_cost
+                        sources[neighbour] = node
+                        heapq.heappush(pq, (new_cost + h(neighbour), next(counter), neighbour))
+
+        raise ValueError("No path is found")
+
+    def refine(self, waypoints):
+        """
+        Turn a list of waypoints from find_path(...) into a list of jump points, by searching inside each cluster.
+        """
+        grid = self.grid
+        result = [waypoints[0]]
+        for (ax, ay), (bx, by) in zip(waypoints, waypoints[1:]):
+            if max(abs(ax - bx), abs(ay - by)) <= 1:
+                result.append((bx, by))
+            else:
+                a, b = grid.index(ax, ay), grid.index(bx, by)
+                cluster = self.cluster_of(ax, ay)
+                # only paths between transitions are worth keeping; the start and end change every query
+                remember = a in cluster.nodes and b in cluster.nodes
+                result.extend(cluster.path(a, b, self.options, remember)[1:])
+        return result
+
+    def _find_transitions(self):
+        grid, size = self.grid, self.cluster_size
+        width, height = grid.width, grid.height
+        for border in range(size, width, size):
+            for y0 in range(0, height, size):
+                # cells (border - 1, y) and (border, y) on either side of a vertical border
+                self._cross(lambda y: (border - 1, y), lambda y: (border, y), y0, min(y0 + size, height))
+        for border in range(size, height, size):
+            for x0 in range(0, width, size):
+                self._cross(lambda x: (x, border - 1), lambda x: (x, border), x0, min(x0 + size, width))
+
+        # where four clusters meet, the corner cells can be crossed diagonally
+        for bx in range(size, width, size):
+            for by in range(size, height, size):
+                for a, b in (((bx - 1, by - 1), (bx, by)), ((bx, by - 1), (bx - 1, by))):
+                    if grid.is_walkable(*a) and grid.is_walkable(*b):
+                        self._add_transition(a, b)
+
+    def _cross(self, near, far, lo, hi):
+        """
+        Add the transitions across one stretch of border between two clusters.
+
+        Parameters
+        near, far - functions from a position along the border to the (x, y) of the cell on each side of it
+        lo, hi    - the range of positions along the border
+        """
+        grid = self.grid
+        straight = [grid.is_walkable(*near(i)) and grid.is_walkable(*far(i)) for i in range(lo, hi)]
+
+        # each run of cells that can be crossed straight over is an entrance. Long ones get a transition at each end.
+        i = lo
+        while i < hi:
+            if not straight[i - lo]:
+                i += 1
+                continue
+            j = i
+            while j + 1 < hi and straight[j + 1 - lo]:
+                j += 1
+            if j - i + 1 >= 6:
+                self._add_transition(near(i), far(i))
+                self._add_transition(near(j), far(j))
+            else:
+                self._add_transition(near((i + j) // 2), far((i + j) // 2))
+            i = j + 1
+
+        # a diagonal step over the border needs its own transition unless both its cells are in the same entrance
+        for i in range(lo, hi):
+            for k in (i - 1, i + 1):
+                if lo <= k < hi and not (straight[i - lo] and straight[k - lo]):
+                    if grid.is_walkable(*near(i)) and grid.is_walkable(*far(k)):
+                        self._add_transition(near(i), far(k))
+
+    def _add_transition(self, a, b):
+        grid = self.grid
+        i, j = grid.index(*a), grid.index(*b)
+        self.edges.setdefault(i, {})[j] = 1
+        self.edges.setdefault(j, {})[i] = 1
+        for cell, (x, y) in ((i, a), (j, b)):
+            nodes = self.cluster_of(x, y).nodes
+            if cell not in nodes:
+                nodes.append(cell)
+
+    def _connect_inside(self, cluster):
+        """ Find the cost between every pair of transition cells in cluster, with jps(...) on the cluster alone. """
+        nodes = cluster.nodes
+        for k, a in enumerate(nodes):
+            for b in nodes[k + 1:]:
+                cost = cluster.cost(a, b, self.options)
+                if cost is not None and cost < self.edges[a].get(b, cost + 1):
+                    self.edges[a][b] = cost
+                    self.edges[b][a] = cost
+
+class AbstractPath(list):
+    """
+    A list of waypoints from Hierarchy.find_path(...). jps.get_full_path(...) refines it into real cells.
+    """
+    def __init__(self, hierarchy, waypoints):
+        list.__init__(self, waypoints)
+        self.hierarchy = hierarchy
+
+    def refine(self):
+        """ Return the path as a list of jump points, like jps(...) would. """
+        return self.hierarchy.refine(self)
+
+class _Cluster(object):
+    """
+    One cluster of a Hierarchy: a rectangle of the grid, compiled into its own Grid with a border of obstacles
+    so that searches can't leave it.
+    """
+    def __init__(self, grid, x0, y0, x1, y1):
+        self.x0, self.y0 = x0, y0
+        self.height = grid.height
+        field = [[jps.OBSTACLE] * (y1 - y0 + 2)]
+        for x in range(x0, x1):
+            field.append([jps.OBSTACLE] + [jps.UNINITIALIZED if grid.is_walkable(x, y) else jps.OBSTACLE for y in range(y0, y1)] + [jps.OBSTACLE])
+        field.append([jps.OBSTACLE] * (y1 - y0 + 2))
+        self.grid = jps.Grid(field)
+        self.nodes = []   # indices (in the whole grid) of the transition cells in this cluster
+        self._paths = {}
+
+    def path(self, a, b, options, remember=True):
+        """
+        The jump points of the shortest path from a to b (indices in the whole grid) that stays in this cluster,
+        in the whole grid's coordinates, or None if there isn't one. Paths between transitions are remembered;
+        set remember=False for one-off paths to a query's start or end.
+        """
+        if (a, b) in self._paths:
+            return self._paths[a, b]
+        (ax, ay), (bx, by) = divmod(a, self.height), divmod(b, self.height)
+        dx, dy = self.x0 - 1, self.y0 - 1
+        try:
+            path = [(x + dx, y + dy) for x, y in jps.jps(self.grid, ax - dx, ay - dy, bx - dx, by - dy, **options)]
+        except ValueError:
+            path = None
+        if remember:
+            self._paths[a, b] = path
+        return path
+
+    def cost(self, a, b, options, remember=True):
+        """ The length of path(a, b, options), or None """
+        path = self.path(a, b, options, remember)
+        if path is None:
+            return None
+        return sum(max(abs(p[0] - q[0]), abs(p[1] - q[1])) for p, q in zip(path, path[1:]))
@@ -0,0 +1,70 @@
+# Hierarchical search: build the abstract graph for a map once, then compare long queries with flat search
+from jps import *
+import hpa, random, time
+
+set_visual(False)
+random.seed(1)
+
+def connected(grid, q):
+    try:
+        return bool(jps(grid, *q))
+    except ValueError:
+        return False
+
+def compare(name, grid, cluster_sizes, count=20):
+    cells = [i for i in range(grid.width * grid.height) if grid.walkable[i]]
+    try:
+        grid.label_components()
+    except ImportError as err:
+        # without the labels, keep the queries that have a path by searching them
+        print("You don't have numpy. Picking connected queries by searching. ", err)
+        cells = [grid.coords(i) for i in cells]
+        queries = []
+        while len(queries) < count:
+            q = random.choice(cells) + random.choice(cells)
+            if connected(grid, q):
+                queries.append(q)
+    else:
+        biggest = max(set(grid.components[i] for i in cells), key=[grid.components[i] for i in cells].count)
+        cells = [grid.coords(i) for i in cells if grid.components[i] == biggest]
+        queries = [random.choice(cells) + random.choice(cells) for i in range(count)]
+
+    t = time.time()
+    flat = [len(get_full_path(jps(grid, *q))) - 1 for q in queries]
+    flat_time = time.time() - t
+    print(name, "- flat search: %.3f for %d queries" % (flat_time, count))
+
+    for cluster_size in cluster_sizes:
+        hierarchy = hpa.Hierarchy(grid, cluster_size)
+        t = time.time()
+        paths = [hierarchy.find_path(*q) for q in queries]
+        search_time = time.time() - t
+        t = time.time()
+        steps = [len(get_full_path(path)) - 1 for path in paths]
+        refine_time = time.time() - t
+        print("  clusters of", cluster_size, "- build:", hierarchy.stats,
+              "search: %.3f (%.1fx faster)" % (search_time, flat_time / search_time),
+              "refine: %.3f" % refine_time, "path length: +%.1f%%" % (100.0 * (sum(steps) - sum(flat)) / sum(flat)))
+
+# 20x20 rooms joined by doors, with some clutter
+field = [[OBSTACLE if x % 20 == 0 or y % 20 == 0 or x == 399 or y == 399 else UNINITIALIZED for y in range(400)] for x in range(400)]
+for x in range(0, 380, 20):
+    for y in range(0, 380, 20):
+        if random.random() < 0.7:
+            door = random.randint(y + 2, y + 17)
+            field[x + 20][door] = field[x + 20][door + 1] = UNINITIALIZED
+        if random.random() < 0.7:
+            door = random.randint(x + 2, x + 17)
+            field[door][y + 20] = field[door + 1][y + 20] = UNINITIALIZED
+for i in range(5000):
+    x, y = random.randrange(400), random.randrange(400)
+    if x % 20 and y % 20:
+        field[x][y] = OBSTACLE
+compare("rooms", Grid(field), (20, 40))
+
+try:
+    toronto = Grid(load_path_image('toronto.png', 0x00ffff))
+except ImportError as err:
+    print("You don't have numpy, or pygame or Pillow. Cannot load the toronto map. ", err)
+else:
+    compare("toronto", toronto, (16, 32))
@@ -9,6 +9,7 @@
 #
 # Using this function: 
 #   - use generate_field(...) to create an 2d array denoting which cells are walkable
+#   - optionally, compile the field into a Grid(...) once if you will search it many times.
 #   - use jps(...) to get paths.
 #   - use get_full_path(...) on the result from jps to get every cell in the path. 
 #
@@ -22,17 +23,28 @@ from __future__ import print_function
 
 __author__ = "Christopher Chu"
 
-import itertools, heapq
+import binascii, hashlib, itertools, heapq, mmap, struct, sys, time
+from collections import OrderedDict
+from array import array
 
 # Define some constants representing the things that can be in a field.
 OBSTACLE = -10
 DESTINATION = -2
 UNINITIALIZED = -1
 
+# The 8 directions of travel as (x, y) steps, in the order jps(...) explores them.
+DIRECTIONS = ((1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (1, -1), (-1, 1), (-1, -1))
+
+# The compiled map format written by Grid.save(...): a header, then 8 byte aligned sections.
+MAP_MAGIC = b'JPSGRID\0'
+MAP_VERSION = 1
+_MAP_HEADER = struct.Struct('<8sIIIIII32s')   # magic, version, flags, width, height, component count, landmark count, SHA-256
+_PACKED, _HAS_TABLES, _HAS_COMPONENTS, _BIG_ENDIAN = 1, 2, 4, 8
+
+_BIT_DIGITS = bytes.maketrans(b'\0\1', b'01')   # walkability bytes to the digits of a binary number
+
 DEBUG = False  
 VISUAL = True
-expanded = [[False for j in range(150)] for i in range(200)]  
-visited = [[False for j in range(150)] for i in range(200)]
 
 class FastPriorityQueue():
     """
@@ -59,19 +71,967 @@ class FastPriorityQueue():
     def empty(self):
         return len(self.pq) == 0
 
-def generate_field(terrain, walkable_fcn, pad=False):
+    def __len__(self):
+        return len(self.pq)
+
+class SearchTracer(object):
+    """
+    Statistics and a record of the cells touched by one search. Pass one to jps(..., tracer=...) to fill it in,
+    then read it or give it to draw_jps(...). Without a tracer, the search doesn't record anything.
+
+    expanded       - the number of jump points expanded
+                     (a tracer can be passed to several searches: the counts and times add up)
+    scanned        - the number of cell steps taken looking for jump points (a cell can be scanned more than once)
+    pushes, pops   - the number of priority queue operations
+    times          - seconds spent in each phase: 'setup' (compiling the grid, preprocessing), 'search' and 'path'
+    expanded_cells - the set of (x, y) coordinates of the expanded jump points
+    visited_cells  - the set of (x, y) coordinates of the cells scanned
+    expansion_counts - how many times each cell was expanded, over all the searches, indexed like the grid.
+                     render_search(..., heatmap=True) draws it. It is started again if a search is on a grid of another size.
+    """
+    def __init__(self):
+        self.expanded = 0
+        self.scanned = 0
+        self.pushes = 0
+        self.pops = 0
+        self.times = {}
+        self.expanded_cells = set()
+        self.visited_cells = set()
+        self.expansion_counts = None
+        self._clock = None
+        self._visits = None   # how many times each cell was scanned, indexed like the grid
+
+    def _start(self, grid):
+        self._visits = array('I', [0]) * (grid.width * grid.height)
+
+    def _lap(self, phase):
+        """ Add the time since the last lap to phase. """
+        now = time.time()
+        if phase is not None:
+            self.times[phase] = self.times.get(phase, 0) + now - self._clock
+        self._clock = now
+
+    def _finish(self, grid, expanded=None):
+        """
+        Collect the cells touched by the search from the grid's scratch state, so that the search itself
+        doesn't have to record them. expanded is an iterable of indices, if the grid's closed set doesn't say.
+        """
+        height, generation = grid.height, grid._generation
+        if expanded is None:
+            expanded = [i for i, g in enumerate(grid._closed) if g == generation]
+        self.expanded_cells.update(divmod(i, height) for i in expanded)
+        self.expanded += len(expanded)
+        if self.expansion_counts is None or len(self.expansion_counts) != grid.width * height:
+            self.expansion_counts = array('I', [0]) * (grid.width * height)
+        for i in expanded:
+            self.expansion_counts [i] += 1
+        self.visited_cells.update(divmod(i, height) for i, n in enumerate(self._visits) if n)
+        self.scanned += sum(self._visits)
+        self._visits = None
+
+class BucketPriorityQueue(object):
+    """
+    A bucket (Dial) priority queue for small integer priorities, like the f costs in A*.
+    Moving to the next bucket is O(1), and each bucket is visited at most once if the priorities never go below
+    the last one popped, as with A* and a consistent heuristic.
+
+    Each task is queued at most once. Adding a task that is already queued only moves it if the new priority is
+    better (decrease-key), and a task that has been popped can't be added again (closed set).
+    A priority is an int, or a tuple whose first element is an int bucket. The rest of the tuple breaks ties
+    inside a bucket, with a small heap per bucket.
+    """
+    def __init__(self):
+        self.buckets = {}      # bucket -> heap of (rest of priority, count, task)
+        self.queued = {}       # task -> (bucket, rest of priority, count) it is queued with
+        self.closed = set()    # tasks that have been popped
+        self.cursor = 0        # no bucket below this one has any tasks
+        self.counter = itertools.count()
+
+    def add_task(self, task, priority=0):
+        'Add a new task, or move an existing one to a better priority'
+        if isinstance(priority, tuple):
+            key, rest = priority[0], priority[1:]
+        else:
+            key, rest = priority, ()
+        if task in self.closed:
+            return
+        old = self.queued.get(task)
+        if old is not None and (old[0], old[1]) <= (key, rest):
+            return   # already queued at least as well. Otherwise this is a decrease-key, and the old entry goes stale.
+
+        count = next(self.counter)
+        self.queued[task] = (key, rest, count)
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            self.buckets[key] = [(rest, count, task)]
+        else:
+            heapq.heappush(bucket, (rest, count, task))
+        if key < self.cursor or len(self.queued) == 1:
+            self.cursor = key
+
+    def pop_task(self):
+        'Remove and return the lowest priority task. Raise KeyError if empty.'
+        queued, buckets = self.queued, self.buckets
+        while queued:
+            bucket = buckets.get(self.cursor)
+            while bucket:
+                rest, count, task = heapq.heappop(bucket)
+                entry = queued.get(task)
+                if entry is not None and entry[2] == count:   # skip stale entries
+                    del queued[task]
+                    self.closed.add(task)
+                    return task
+            buckets.pop(self.cursor, None)
+            self.cursor += 1
+        raise KeyError('pop from an empty priority queue')
+
+    def empty(self):
+        return not self.queued
+
+    def __len__(self):
+        return len(self.queued)
+
+class _TracedQueue(object):
+    """ Wraps a priority queue to count its operations in a SearchTracer, and remember what was popped. """
+    def __init__(self, pq, tracer):
+        self.pq = pq
+        self.tracer = tracer
+        self.popped = []
+
+    def add_task(self, task, priority=0):
+        self.tracer.pushes += 1
+        self.pq.add_task(task, priority)
+
+    def pop_task(self):
+        task = self.pq.pop_task()
+        self.tracer.pops += 1
+        self.popped.append(task)
+        return task
+
+    def empty(self):
+        return self.pq.empty()
+
+    def __len__(self):
+        return len(self.pq)
+
+class PathCache(object):
+    """
+    A bounded, least-recently-used cache of jump point paths for one grid. See Grid.cache_paths(...).
+
+    A query is a hit if the exact (start, end) pair is cached, or if both start and end lie on a cached path:
+    part of a shortest path is a shortest path too. Making a cell an obstacle only evicts the paths that cross it,
+    and making one walkable only evicts the paths it could shorten.
+
+    hits, misses  - the number of lookups that found a path or didn't
+    invalidations - the number of paths evicted by obstacle edits
+    """
+    def __init__(self, grid, maxsize=1024):
+        self.grid = grid
+        self.maxsize = maxsize
+        self.entries = OrderedDict()   # (start, end) -> (jump points, indices of every cell on the path), oldest first
+        self.on_cell = {}              # index of a cell -> set of the keys whose paths cross it
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, start, end):
+        """
+        Look up the path from cell index start to cell index end.
+
+        Return
+        a list of jump points as 2-tuples, or None if it isn't cached.
+        """
+        entry = self.entries.get((start, end))
+        if entry is not None:
+            self.entries.move_to_end((start, end))
+            self.hits += 1
+            return list(entry[0])
+
+        for key in self.on_cell.get(start, set()) & self.on_cell.get(end, set()):
+            cells = self.entries[key][1]
+            i, j = cells.index(start), cells.index(end)
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return _jump_points([self.grid.coords(c) for c in (cells[i:j + 1] if i <= j else cells[j:i + 1][::-1])])
+
+        self.misses += 1
+        return None
+
+    def put(self, start, end, path):
+        """ Cache path, a list of jump points from cell index start to cell index end. """
+        if (start, end) in self.entries:
+            self._remove((start, end))
+        cells = [self.grid.index(x, y) for x, y in get_full_path(path)]
+        self.entries[start, end] = (list(path), cells)
+        for cell in cells:
+            self.on_cell.setdefault(cell, set()).add((start, end))
+        while len(self.entries) > self.maxsize:
+            self._remove(next(iter(self.entries)))
+
+    def invalidate(self, cell):
+        """ Evict every path that crosses cell (an index). """
+        for key in list(self.on_cell.get(cell, ())):
+            self._remove(key)
+            self.invalidations += 1
+
+    def invalidate_shortcut(self, cell):
+        """
+        cell (an index) has just become walkable. Evict every path that might now have a shortcut through it:
+        those where going through the cell would be shorter even by straight line (Chebyshev) distance.
+        """
+        cx, cy = self.grid.coords(cell)
+        for key in list(self.entries):
+            (sx, sy), (ex, ey) = self.grid.coords(key[0]), self.grid.coords(key[1])
+            length = len(self.entries[key][1]) - 1
+            if max(abs(sx - cx), abs(sy - cy)) + max(abs(ex - cx), abs(ey - cy)) < length:
+                self._remove(key)
+                self.invalidations += 1
+
+    def clear(self):
+        self.entries.clear()
+        self.on_cell.clear()
+
+    def _remove(self, key):
+        path, cells = self.entries.pop(key)
+        for cell in cells:
+            keys = self.on_cell[cell]
+            keys.discard(key)
+            if not keys:
+                del self.on_cell[cell]
+
+class Grid(object):
+    """
+    A field compiled once into flat arrays, so that it can be searched many times without copying it.
+
+    Cell (x, y) is stored at index x * height + y. Walkability is kept in a bytearray, and the per-query
+    scratch state (cost and jump-point predecessor of each cell) lives in arrays that are never cleared.
+    Instead, each query gets a new generation number, and a cell's scratch values only count if its
+    stamp matches the current generation. A query therefore only pays for the cells it touches.
+
+    A grid holds the scratch state of one query at a time, so don't search the same grid from two threads at once.
+    """
+    MAX_GENERATION = 0xFFFFFFFF
+
+    def __init__(self, field):
+        """
+        field - a 2d rectangular array (list of lists or numpy array) as made by generate_field(...).
+                Anything other than OBSTACLE is walkable.
+        """
+        self.width = len(field)
+        self.height = len(field[0])
+        if hasattr(field, 'shape'):  # numpy array, e.g. from load_obstacle_image(...)
+            self.walkable = bytearray((field != OBSTACLE).astype('uint8').tobytes(order='C'))
+        else:
+            self.walkable = bytearray(cell != OBSTACLE for column in field for cell in column)
+        self._init_scratch()
+
+        self.jump_distances = None               # JPS+ tables, see preprocess_jump_distances()
+        self.jump_stats = None
+        self.bitsets = None                      # row and column bitsets, see build_bitsets()
+        self.landmarks = None                    # ALT landmarks and their distance tables, see preprocess_landmarks()
+        self.components = None                   # connected component labels, see label_components()
+        self.component_count = 0
+        self.path_cache = None                   # see cache_paths()
+        self.content_hash = None                 # the hash of the compiled map file it was loaded from, see load()
+
+    @classmethod
+    def from_buffer(cls, walkable, width, height, jump_distances=None):
+        """
+        Make a grid that uses an existing buffer as its walkability array instead of copying it,
+        e.g. a multiprocessing.shared_memory block. Only the per-query scratch state is allocated.
+
+        Parameters
+        walkable       - a buffer of width * height bytes, 1 for walkable cells and 0 for obstacles
+        width, height  - the dimensions of the grid
+        jump_distances - optionally, 8 sequences of ints to use as the JPS+ tables (see preprocess_jump_distances)
+        """
+        grid = cls.__new__(cls)
+        grid.width, grid.height = width, height
+        grid.walkable = memoryview(walkable)[:width * height]
+        grid._init_scratch()
+        grid.jump_distances = jump_distances
+        grid.jump_stats = None
+        grid.bitsets = None
+        grid.landmarks = None
+        grid.components = None
+        grid.component_count = 0
+        grid.path_cache = None
+        grid.content_hash = None
+        return grid
+
+    def save(self, path, packed=False):
+        """
+        Write the grid to a compiled map file, with its JPS+ tables, component labels and landmarks if they have been
+        computed, so that it can be opened again with Grid.load(...) without decoding an image or preprocessing it.
+
+        The file is a 64 byte header (MAP_MAGIC, format version, flags, width, height, number of components, number
+        of landmarks and a SHA-256 hash of everything after the header), followed by 8 byte aligned sections:
+        the walkability grid, then the 8 tables of int32 jump distances in DIRECTIONS order, then the int32 component
+        labels, then the int32 indices of the landmarks and their int32 distance tables.
+        Cells are in the same order as in the grid, x * height + y, and the ints are in this machine's byte order.
+
+        Parameters
+        path   - the file to write
+        packed - if true, store walkability as 1 bit per cell instead of 1 byte, for a smaller file (requires numpy).
+                 A packed grid has to be unpacked into memory when it is loaded, so only its tables are shared
+                 between processes. An unpacked one can be searched straight from the file.
+
+        Return
+        the content hash, as a hex string
+        """
+        if packed:
+            import numpy as np
+            walkable = np.packbits(np.frombuffer(bytes(self.walkable), dtype=np.uint8)).tobytes()
+        else:
+            walkable = bytes(self.walkable)
+        sections = [walkable]
+        flags = _PACKED if packed else 0
+        if sys.byteorder == 'big':
+            flags |= _BIG_ENDIAN
+        if self.jump_distances is not None:
+            flags |= _HAS_TABLES
+            sections.extend(bytes(memoryview(table).cast('B')) for table in self.jump_distances)
+        if self.components is not None:
+            flags |= _HAS_COMPONENTS
+            sections.append(bytes(memoryview(self.components).cast('B')))
+        landmarks = self.landmarks or []
+        if landmarks:
+            sections.append(array('i', [cell for cell, table in landmarks]).tobytes())
+            sections.extend(bytes(memoryview(table).cast('B')) for cell, table in landmarks)
+
+        digest = hashlib.sha256()
+        body = []
+        for section in sections:
+            section += b'\0' * (-len(section) % 8)
+            digest.update(section)
+            body.append(section)
+        header = _MAP_HEADER.pack(MAP_MAGIC, MAP_VERSION, flags, self.width, self.height, self.component_count,
+                                  len(landmarks), digest.digest())
+        with open(path, 'wb') as f:
+            f.write(header)
+            for section in body:
+                f.write(section)
+        return digest.hexdigest()
+
+    @classmethod
+    def load(cls, path, verify=False):
+        """
+        Open a compiled map file written by save(...). The file is memory-mapped read-only, and the grid searches
+        its walkability (unless it was packed), tables and component labels in place: opening it is almost instant
+        however big the map is, and processes that load the same file share one copy of it in the page cache.
+        Only each grid's per-query scratch state is allocated.
+
+        Don't edit the grid: the parts mapped from the file are read-only, and add_obstacle(...) and friends
+        raise TypeError when they try to write to them.
+
+        Parameters
+        path   - the file to open
+        verify - if true, check the content hash. That reads the whole file, so it is off by default.
+
+        Return
+        a Grid. Its content_hash is the hash from the header, as a hex string.
+        Raises ValueError if the file isn't a compiled map of this version or byte order, or fails verification.
+        """
+        with open(path, 'rb') as f:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(mapping)
+        if len(view) < _MAP_HEADER.size:
+            raise ValueError("Not a compiled map: {}".format(path))
+        magic, version, flags, width, height, component_count, landmark_count, digest = _MAP_HEADER.unpack(view[:_MAP_HEADER.size])
+        if magic != MAP_MAGIC:
+            raise ValueError("Not a compiled map: {}".format(path))
+        if version != MAP_VERSION:
+            raise ValueError("Unsupported compiled map version {} in {}".format(version, path))
+        if bool(flags & _BIG_ENDIAN) != (sys.byteorder == 'big'):
+            raise ValueError("{} was compiled on a machine with the other byte order".format(path))
+        if verify and hashlib.sha256(view[_MAP_HEADER.size:]).digest() != digest:
+            raise ValueError("The content hash of {} doesn't match: the file is damaged".format(path))
+
+        size = width * height
+        offset = _MAP_HEADER.size
+
+        def section(length):
+            nonlocal offset
+            start, offset = offset, offset + length + (-length % 8)
+            if offset > len(view):
+                raise ValueError("{} is truncated".format(path))
+            return view[start:start + length]
+
+        if flags & _PACKED:
+            import numpy as np
+            bits = np.frombuffer(section((size + 7) // 8), dtype=np.uint8)
+            walkable = bytearray(np.unpackbits(bits)[:size].tobytes())
+        else:
+            walkable = section(size)
+        tables = [section(size * 4).cast('i') for d in DIRECTIONS] if flags & _HAS_TABLES else None
+
+        grid = cls.from_buffer(walkable, width, height, tables)
+        if flags & _HAS_COMPONENTS:
+            grid.components = section(size * 4).cast('i')
+            grid.component_count = component_count
+        if landmark_count:
+            cells = section(landmark_count * 4).cast('i')
+            grid.landmarks = [(cells[k], section(size * 4).cast('i')) for k in range(landmark_count)]
+        grid.content_hash = binascii.hexlify(digest).decode('ascii')
+        grid._mapping = mapping   # keep the file mapped for as long as the grid lives
+        return grid
+
+    def _init_scratch(self):
+        size = self.width * self.height
+        self._cost = array('i', [0]) * size      # cost to get to each cell in the current query
+        self._source = array('i', [-1]) * size   # index of the jump-point predecessor of each cell
+        self._stamp = array('I', [0]) * size     # generation in which the scratch values above were written
+        self._closed = array('I', [0]) * size    # generation in which each cell was expanded
+        self._back = None                        # the same four arrays for backward searches, see _backward_scratch()
+        self._generation = 0
+
+    def index(self, x, y):
+        return x * self.height + y
+
+    def coords(self, i):
+        return divmod(i, self.height)
+
+    def is_walkable(self, x, y):
+        return bool(self.walkable[x * self.height + y])
+
+    def to_field(self):
+        """
+        Return the grid as a fresh 2d array in the same format as generate_field(...)
+        """
+        h = self.height
+        return [[UNINITIALIZED if w else OBSTACLE for w in self.walkable[x * h:(x + 1) * h]] for x in range(self.width)]
+
+    def preprocess_jump_distances(self):
+        """
+        JPS+ preprocessing: for every walkable cell and each of the 8 DIRECTIONS, compute how far the
+        search would travel in that direction before it stops. Afterwards jps(grid, ..., mode='jps+')
+        jumps in O(1) instead of walking cell by cell. Requires numpy.
+
+        A positive distance k means the cell k steps away is a jump point. Zero or a negative distance -k
+        means there's no jump point in that direction, and the last walkable cell before a wall is k steps away.
+        Cardinal jump points are cells with a forced neighbour. Diagonal jump points are cells with a forced
+        neighbour, or cells from which either cardinal component of the direction reaches a jump point.
+
+        Return
+        a dict with the time taken in 'seconds' and the size of the tables in 'bytes'. It is also kept in jump_stats.
+        """
+        import numpy as np
+        t = time.time()
+
+        # pad the grid with a ring of obstacles so that the shifted views below never run off the edge
+        w = np.zeros((self.width + 2, self.height + 2), dtype=bool)
+        w[1:-1, 1:-1] = np.frombuffer(bytes(self.walkable), dtype=np.uint8).reshape(self.width, self.height)
+
+        def shifted(dx, dy):
+            # shifted(dx, dy)[x, y] is whether cell (x + dx, y + dy) is walkable
+            return w[1 + dx:w.shape[0] - 1 + dx, 1 + dy:w.shape[1] - 1 + dy]
+
+        walkable = shifted(0, 0)
+        tables = {}
+        for dx, dy in DIRECTIONS[:4]:
+            # a cell is a jump point when a perpendicular neighbour is blocked but the next cell past it is open
+            sx, sy = dy, dx
+            jump = walkable & ((~shifted(sx, sy) & shifted(sx + dx, sy + dy)) | (~shifted(-sx, -sy) & shifted(-sx + dx, -sy + dy)))
+            tables[dx, dy] = _line_distances(np, ~walkable, jump, 0 if dx else 1, dx + dy < 0)
+
+        for dx, dy in DIRECTIONS[4:]:
+            jump = walkable & ((~shifted(-dx, 0) & shifted(-dx, dy)) | (~shifted(0, -dy) & shifted(dx, -dy)) |
+                               (tables[dx, 0] > 0) | (tables[0, dy] > 0))
+            tables[dx, dy] = _diagonal_distances(np, walkable, jump, dx, dy)
+
+        self.jump_distances = [array('i', tables[d].astype(np.int32).tobytes()) for d in DIRECTIONS]
+        self.jump_stats = {'seconds': time.time() - t,
+                           'bytes': sum(len(table) * table.itemsize for table in self.jump_distances)}
+        return self.jump_stats
+
+    def preprocess_landmarks(self, count=8):
+        """
+        ALT preprocessing: choose count landmarks around the largest connected area of the grid, and store the distance
+        from each of them to every cell. Moving one step changes a cell's distance to a landmark by at most 1, so
+        |distance(landmark, a) - distance(landmark, b)| is never more than the distance from a to b. Afterwards
+        jps(...) takes the largest of these bounds and the Chebyshev distance as its heuristic, which is still
+        admissible and consistent, but much closer to the real distance on mazes and walled maps, where Chebyshev
+        alone sends the search into every dead end that points towards the goal. Requires numpy.
+
+        Each landmark is the cell furthest from the ones already chosen (the first is furthest from an arbitrary cell),
+        so they end up around the edges of the map, behind the places paths have to go around.
+
+        add_obstacle(...) keeps the tables, since blocking cells only makes paths longer and the bounds stay admissible.
+        remove_obstacle(...) drops them: run this again afterwards.
+
+        Return
+        a dict with the time taken in 'seconds' and the size of the tables in 'bytes'. landmarks is then a list of
+        (cell index, distance table) pairs. A table holds -1 for the cells its landmark can't reach.
+        """
+        import numpy as np
+        t = time.time()
+
+        walkable = np.frombuffer(bytes(self.walkable), dtype=np.uint8).reshape(self.width, self.height).astype(bool)
+        labels = _label_components(np, walkable).ravel()
+        self.landmarks = []
+        if labels.any():
+            largest = np.bincount(labels)[1:].argmax() + 1
+            seed = int(np.flatnonzero(labels == largest)[0])
+            closest = flow_field(self, *self.coords(seed))[0].ravel()   # distance to the nearest landmark so far
+            while len(self.landmarks) < count and closest.max() > 0:
+                cell = int(closest.argmax())
+                table = flow_field(self, *self.coords(cell))[0].ravel()
+                self.landmarks.append((cell, array('i', table.astype(np.int32).tobytes())))
+                closest = np.minimum(closest, table)
+
+        return {'seconds': time.time() - t, 'bytes': sum(len(table) * table.itemsize for cell, table in self.landmarks)}
+
+    def _landmark_bounds(self, end):
+        """ The (distance table, distance to end) of each landmark that can reach cell end, for _jps_astar(...) """
+        return [(table, table [end]) for cell, table in self.landmarks or () if table [end] >= 0]
+
+    def build_bitsets(self):
+        """
+        Pack each column and row of the grid into a Python int used as a bitset, so that jps(grid, ..., mode='bitset')
+        finds where a cardinal scan stops with a few operations on whole machine words instead of stepping through
+        the cells one at a time. Doesn't need numpy. The bitsets are kept up to date by add_obstacle(...).
+
+        Each line has two masks, one for each direction of travel along it: bit k is set where a scan in that
+        direction stops at the k-th cell of the line, because the cell is blocked or has a forced neighbour.
+        bitsets is then (a list of the masks of each column, a list of the masks of each row).
+        """
+        lines = [[self._line_bits(axis, k) for k in range(n)] for axis, n in ((0, self.width), (1, self.height))]
+        self.bitsets = tuple([_line_stops(bits[k], bits[k - 1] if k else 0, bits[k + 1] if k + 1 < len(bits) else 0)
+                              for k in range(len(bits))] for bits in lines)
+
+    def _line_bits(self, axis, k):
+        """ The walkability of column k (axis 0) or row k (axis 1) as a bitset, or 0 if there is no such line. """
+        if axis == 0:
+            if not 0 <= k < self.width:
+                return 0
+            cells = self.walkable[k * self.height:(k + 1) * self.height]
+        else:
+            if not 0 <= k < self.height:
+                return 0
+            cells = self.walkable[k::self.height]
+        return int(bytes(cells[::-1]).translate(_BIT_DIGITS) or b'0', 2)
+
+    def _update_bitsets(self, changed):
+        """ Rebuild the masks of the lines through and next to the cells in changed (indices). """
+        lines = (set(), set())
+        for i in changed:
+            x, y = divmod(i, self.height)
+            lines[0].update((x - 1, x, x + 1))
+            lines[1].update((y - 1, y, y + 1))
+        for axis, stops in enumerate(self.bitsets):
+            for k in lines[axis]:
+                if 0 <= k < len(stops):
+                    stops[k] = _line_stops(self._line_bits(axis, k), self._line_bits(axis, k - 1), self._line_bits(axis, k + 1))
+
+    def label_components(self):
+        """
+        Label the connected areas of the grid, so that jps(...) can reject a query whose start and end are in different
+        areas in O(1), instead of searching everything reachable from the start. Requires numpy.
+        The labels are kept up to date by add_obstacle(...).
+
+        Return
+        the number of connected areas. components[i] is then the area of cell i: 1 or more if it's walkable, 0 if not.
+        """
+        import numpy as np
+        walkable = np.frombuffer(bytes(self.walkable), dtype=np.uint8).reshape(self.width, self.height).astype(bool)
+        labels = _label_components(np, walkable)
+        self.components = array('i', labels.astype(np.int32).tobytes())
+        self.component_count = int(labels.max()) if labels.size else 0
+        return self.component_count
+
+    def cache_paths(self, maxsize=1024):
+        """
+        Start caching the paths that jps(...) finds on this grid, keeping up to maxsize of them.
+        Only searches with optimal paths (prune=True) are cached. Set path_cache to None to stop.
+
+        Return
+        the PathCache, which has hit and miss counters.
+        """
+        self.path_cache = PathCache(self, maxsize)
+        return self.path_cache
+
+    def add_obstacle(self, x, y):
+        """
+        Make cell (x, y) an obstacle, and update everything derived from the grid locally:
+        - the JPS+ tables, along the lines through the cell and its neighbours, back to the previous jump point or wall.
+        - the connected component labels. Only the component the cell was in is relabelled, and only if
+          removing the cell could split it.
+        - the path cache. Only the paths through the cell are evicted.
+        """
+        self.apply_edits(added=[(x, y)])
+
+    def remove_obstacle(self, x, y):
+        """
+        Make cell (x, y) walkable, and update everything derived from the grid locally:
+        - the JPS+ tables, as in add_obstacle(...)
+        - the connected component labels. The components next to the cell are merged.
+        - the path cache. Only the paths that could be shortened by going through the cell are evicted.
+        """
+        self.apply_edits(removed=[(x, y)])
+
+    def apply_edits(self, added=(), removed=()):
+        """
+        Apply a batch of obstacle edits, as from field_gui.py. See add_obstacle(...) and remove_obstacle(...).
+
+        Parameters
+        added   - (x, y) coordinates of cells to make obstacles
+        removed - (x, y) coordinates of cells to make walkable
+
+        Return
+        the list of indices of the cells that actually changed
+        """
+        changed = []
+        for cells, value in ((added, 0), (removed, 1)):
+            for x, y in cells:
+                i = x * self.height + y
+                if self.walkable[i] == value:
+                    continue
+                self.walkable[i] = value
+                changed.append(i)
+                if self.components is not None:
+                    if value:
+                        self._merge_components(i)
+                    else:
+                        self._split_component(i)
+                if self.path_cache is not None:
+                    if value:
+                        self.path_cache.invalidate_shortcut(i)
+                    else:
+                        self.path_cache.invalidate(i)
+        if changed and self.jump_distances is not None:
+            self._update_jump_distances(changed)
+        if changed and self.bitsets is not None:
+            self._update_bitsets(changed)
+        if self.landmarks is not None and any(self.walkable[i] for i in changed):
+            self.landmarks = None   # a new opening can make paths shorter than the tables say
+        return changed
+
+    def _update_jump_distances(self, changed):
+        """
+        Bring the JPS+ tables up to date after the walkability of the cells in changed (indices) has changed.
+
+        Whether a cell is a cardinal jump point depends only on its neighbours, so only the cells next to a change
+        can gain or lose that status. A cell's distance depends only on the next cell in the direction of travel,
+        so each of those cells is followed backwards, updating distances, until one doesn't change.
+        Diagonal jump points also depend on the cardinal tables, so every cell whose cardinal distance changed sign
+        is followed backwards along the diagonals too.
+        """
+        width, height, walkable = self.width, self.height, self.walkable
+        tables = dict(zip(DIRECTIONS, self.jump_distances))
+
+        def is_open(x, y):
+            return 0 <= x < width and 0 <= y < height and walkable[x * height + y]
+
+        def is_jump(x, y, dx, dy):
+            """ Whether walkable cell (x, y) is a jump point in direction (dx, dy), as in preprocess_jump_distances """
+            if dx == 0 or dy == 0:
+                sx, sy = dy, dx
+                return ((not is_open(x + sx, y + sy) and is_open(x + sx + dx, y + sy + dy)) or
+                        (not is_open(x - sx, y - sy) and is_open(x - sx + dx, y - sy + dy)))
+            return ((not is_open(x - dx, y) and is_open(x - dx, y + dy)) or
+                    (not is_open(x, y - dy) and is_open(x + dx, y - dy)) or
+                    tables[dx, 0][x * height + y] > 0 or tables[0, dy][x * height + y] > 0)
+
+        def distance(x, y, dx, dy):
+            nx, ny = x + dx, y + dy
+            if not is_open(x, y) or not is_open(nx, ny):
+                return 0
+            if is_jump(nx, ny, dx, dy):
+                return 1
+            following = tables[dx, dy][nx * height + ny]
+            return following + 1 if following > 0 else following - 1
+
+        def follow_back(seeds, dx, dy, flipped=None):
+            table = tables[dx, dy]
+            for i in seeds:
+                x, y = divmod(i, height)
+                while 0 <= x < width and 0 <= y < height:
+                    j = x * height + y
+                    new = distance(x, y, dx, dy)
+                    old = table[j]
+                    if new == old and j not in seeds:
+                        break
+                    table[j] = new
+                    if flipped is not None and (new > 0) != (old > 0):
+                        flipped.add(j)
+                    x, y = x - dx, y - dy
+
+        near = set()
+        for i in changed:
+            near.update(self._neighbours(i))
+            near.add(i)
+
+        flipped = dict((d, set()) for d in DIRECTIONS[:4])
+        for dx, dy in DIRECTIONS[:4]:
+            follow_back(near, dx, dy, flipped[dx, dy])
+        for dx, dy in DIRECTIONS[4:]:
+            follow_back(near | flipped[dx, 0] | flipped[0, dy], dx, dy)
+
+    def _merge_components(self, i):
+        """
+        Cell i has just become walkable. Join it and the components next to it into one.
+        """
+        labels, walkable = self.components, self.walkable
+        touching = []
+        for n in self._neighbours(i):
+            if walkable[n] and labels[n] not in [labels[m] for m in touching]:
+                touching.append(n)
+        if not touching:
+            self.component_count += 1
+            labels[i] = self.component_count
+            return
+        if len(touching) == 1:
+            labels[i] = labels[touching[0]]
+            return
+
+        # Flood the touching components at once, a cell at a time each, until only the biggest is still growing.
+        # The others are relabelled to join it, so the work is proportional to the smaller components.
+        growing = dict((labels[n], ([n], set([n]))) for n in touching)
+        finished = []
+        while len(growing) > 1:
+            for label in list(growing):
+                stack, reached = growing[label]
+                if not stack:
+                    finished.append(growing.pop(label)[1])
+                    continue
+                for n in self._neighbours(stack.pop()):
+                    if labels[n] == label and n not in reached:
+                        reached.add(n)
+                        stack.append(n)
+
+        label = next(iter(growing)) if growing else labels[touching[0]]
+        labels[i] = label
+        for reached in finished:
+            for c in reached:
+                labels[c] = label
+
+    def _split_component(self, i):
+        """
+        Cell i has just become an obstacle. Give each part of its component that is no longer connected a new label.
+        """
+        labels, walkable, height = self.components, self.walkable, self.height
+        label = labels[i]
+        labels[i] = 0
+        neighbours = [n for n in self._neighbours(i) if walkable[n]]
+
+        # the neighbours are all still connected if they're connected to each other around the cell
+        groups = []
+        for n in neighbours:
+            touching = [g for g in groups if any(_adjacent(n, m, height) for m in g)]
+            merged = [n]
+            for g in touching:
+                merged.extend(g)
+                groups.remove(g)
+            groups.append(merged)
+        if len(groups) <= 1:
+            return
+
+        # Otherwise flood the component from every group at once, a cell at a time each, merging groups that meet.
+        # A group that runs out of cells without meeting the others has split off. Stop when at most one group is
+        # still growing: it keeps the old label, so the work is proportional to the pieces that split off.
+        owner = {}
+        root = list(range(len(groups)))
+        def find(g):
+            while root[g] != g:
+                g = root[g]
+            return g
+
+        growing = {}
+        for g, cells in enumerate(groups):
+            for c in cells:
+                owner[c] = g
+            growing[g] = list(cells)
+        finished = []
+        while len(growing) > 1:
+            for g in list(growing):
+                stack = growing.get(g)
+                if stack is None:
+                    continue   # merged into another group this round
+                if not stack:
+                    del growing[g]
+                    finished.append(g)
+                    continue
+                for n in self._neighbours(stack.pop()):
+                    if labels[n] != label:
+                        continue
+                    other = owner.get(n)
+                    if other is None:
+                        owner[n] = g
+                        stack.append(n)
+                    elif find(other) != g:
+                        other = find(other)
+                        root[other] = g
+                        stack.extend(growing.pop(other))
+
+        for g in finished:
+            self.component_count += 1
+            for c, owned_by in owner.items():
+                if find(owned_by) == g:
+                    labels[c] = self.component_count
+
+    def _neighbours(self, i):
+        """ The indices of the (up to 8) cells next to cell i that are inside the grid. """
+        x, y = divmod(i, self.height)
+        return [(x + dx) * self.height + y + dy for dx, dy in DIRECTIONS
+                if 0 <= x + dx < self.width and 0 <= y + dy < self.height]
+
+    def _backward_scratch(self):
+        """
+        The cost, source, stamp and closed arrays for the backward half of a bidirectional search. They are only
+        allocated the first time one is run, and use the same generation numbers as the forward arrays.
+        """
+        if self._back is None:
+            size = self.width * self.height
+            self._back = (array('i', [0]) * size, array('i', [-1]) * size, array('I', [0]) * size, array('I', [0]) * size)
+        return self._back
+
+    def _next_generation(self):
+        """
+        Start a new query: invalidate every cell's scratch state in O(1), except on the rare wrap around.
+        """
+        if self._generation == self.MAX_GENERATION:
+            self._stamp = array('I', [0]) * len(self._stamp)
+            self._closed = array('I', [0]) * len(self._closed)
+            self._back = None
+            self._generation = 0
+        self._generation += 1
+        return self._generation
+
+def _line_stops(line, before, after):
+    """
+    The masks of one line for Grid.bitsets, from the walkability bitsets of the line and of the lines either side.
+
+    Return
+    (ahead, behind): the cells where a scan towards higher positions along the line stops, and towards lower ones.
+    """
+    blocked = ~line
+    ahead = blocked | (~before & (before >> 1)) | (~after & (after >> 1))
+    behind = blocked | (~before & (before << 1)) | (~after & (after << 1))
+    return ahead, behind
+
+def _adjacent(i, j, height):
+    """ Whether grid cells i and j are next to each other (including diagonally), and not the same cell. """
+    xi, yi = divmod(i, height)
+    xj, yj = divmod(j, height)
+    return i != j and abs(xi - xj) <= 1 and abs(yi - yj) <= 1
+
+def _label_components(np, walkable):
+    """
+    Label the 8-connected components of a 2d bool array, all at once: every pair of walkable neighbours hooks
+    the larger of their roots onto the smaller, then every cell jumps straight to its root, until nothing changes.
+
+    Return
+    a 2d int array with 0 for unwalkable cells and labels 1, 2, ... for the components
+    """
+    width, height = walkable.shape
+    index = np.arange(width * height, dtype=np.int64).reshape(width, height)
+    sources, targets = [], []
+    for dx, dy in ((1, 0), (0, 1), (1, 1), (1, -1)):
+        a = (slice(0, width - dx), slice(max(0, -dy), height - max(0, dy)))
+        b = (slice(dx, width), slice(max(0, dy), height - max(0, -dy)))
+        both = walkable[a] & walkable[b]
+        sources.append(index[a][both])
+        targets.append(index[b][both])
+    sources, targets = np.concatenate(sources), np.concatenate(targets)
+
+    parent = index.ravel().copy()
+    while True:
+        ps, pt = parent[sources], parent[targets]
+        changed = ps != pt
+        if not changed.any():
+            break
+        np.minimum.at(parent, np.maximum(ps, pt)[changed], np.minimum(ps, pt)[changed])
+        while True:
+            grandparent = parent[parent]
+            if (grandparent == parent).all():
+                break
+            parent = grandparent
+
+    flat = walkable.ravel()
+    labels = np.zeros(width * height, dtype=np.int64)
+    labels[flat] = np.unique(parent[flat], return_inverse=True)[1].ravel() + 1
+    return labels.reshape(width, height)
+
+def _line_distances(np, blocked, jump, axis, reverse):
+    """
+    Jump distances along a cardinal direction, for every cell at once (see Grid.preprocess_jump_distances).
+
+    Parameters
+    np      - the numpy module
+    blocked - 2d bool array of the cells that can't be walked on
+    jump    - 2d bool array of the jump points for this direction
+    axis    - 0 to travel along x, 1 to travel along y
+    reverse - True to travel towards decreasing indices
+
+    Return
+    a 2d int array of distances
+    """
+    if reverse:
+        flip = (slice(None, None, -1), slice(None)) if axis == 0 else (slice(None), slice(None, None, -1))
+        return _line_distances(np, blocked[flip], jump[flip], axis, False)[flip]
+    if axis == 1:
+        return _line_distances(np, blocked.T, jump.T, 0, False).T
+
+    n = blocked.shape[0]
+    index = np.arange(n)[:, None]
+    # position of the first obstacle or jump point at or after each cell. Off the edge (n) counts as an obstacle.
+    events = np.where(blocked | jump, index, n)
+    following = np.minimum.accumulate(events[::-1], axis=0)[::-1]
+    following = np.vstack([following[1:], np.full((1, blocked.shape[1]), n)])   # strictly after each cell
+
+    is_jump = np.take_along_axis(np.vstack([jump, np.zeros((1, jump.shape[1]), dtype=bool)]), following, axis=0)
+    steps = following - index
+    return np.where(blocked, 0, np.where(is_jump, steps, 1 - steps))
+
+def _diagonal_distances(np, walkable, jump, dx, dy):
+    """
+    Jump distances along a diagonal direction (see Grid.preprocess_jump_distances). Each column depends on
+    the next one in the direction of travel, so this sweeps one column at a time and vectorizes along y.
+
+    Parameters
+    np       - the numpy module
+    walkable - 2d bool array of the cells that can be walked on
+    jump     - 2d bool array of the jump points for this direction
+    dx, dy   - the direction of travel
+
+    Return
+    a 2d int array of distances
+    """
+    width, height = walkable.shape
+    result = np.zeros((width, height), dtype=np.int64)
+    ys = slice(max(0, -dy), height - max(0, dy))     # cells whose diagonal neighbour is inside the grid
+    next_ys = slice(max(0, dy), height - max(0, -dy))
+    columns = range(width - 2, -1, -1) if dx > 0 else range(1, width)
+    for x in columns:
+        nxt = result[x + dx, next_ys]
+        nxt_walkable = walkable[x + dx, next_ys]
+        nxt_jump = jump[x + dx, next_ys]
+        column = np.where(nxt_jump, 1, np.where(nxt > 0, nxt + 1, nxt - 1))
+        result[x, ys] = np.where(walkable[x, ys] & nxt_walkable, column, 0)
+    return result
+
+def generate_field(terrain, walkable_fcn=None, pad=False):
     """
     Generate a field from any format as long as a function is provided to determine whether a cell is walkable. 
 
     Parameters
     terrain - a 2d rectangular iterable somehow representing the terrain.
+              If walkable_fcn is None, terrain is a 2d numpy array of bools saying which cells are walkable,
+              and the field is built in one vectorized pass.
     walkable_fcn - a function that takes a a cell from terrain as an argument and returns whether that cell can be walked on.
     pad - if true, this function sets the outermost layer of the map to obstacles. if not, the function does nothing.
 
     Returns:
-    the field
+    the field. It is a 2d numpy array if walkable_fcn is None, and a list of lists otherwise.
     """
-    field = [[UNINITIALIZED if walkable_fcn(j) else OBSTACLE for j in i] for i in terrain]
+    if walkable_fcn is None:
+        import numpy as np
+        field = np.where(np.asarray(terrain, dtype=bool), UNINITIALIZED, OBSTACLE).astype(np.int32)
+    else:
+        field = [[UNINITIALIZED if walkable_fcn(j) else OBSTACLE for j in i] for i in terrain]
     if pad:
         pad_field(field)
     return field 
@@ -81,11 +1041,15 @@ def pad_field(field):
     Fill the outer border of a field with obstacles
 
     Parameters
-    field - a 2d rectangular array with obstacles.
+    field - a 2d rectangular array with obstacles. Either a list of lists or a 2d numpy array.
 
     Returns:
     None
     """
+    if hasattr(field, 'shape'):  # numpy array: set each edge with one slice
+        field[0, :] = field[-1, :] = OBSTACLE
+        field[:, 0] = field[:, -1] = OBSTACLE
+        return
     for i in range(len(field)):
         field[i][0] = OBSTACLE
         field[i][-1] = OBSTACLE
@@ -93,69 +1057,485 @@ def pad_field(field):
         field[0][j] = OBSTACLE
         field[-1][j] = OBSTACLE
 
+def _load_image_rgb(img_name):
+    """
+    Load an image as a numpy array of shape (width, height, 3), indexed [x][y] like a field.
+    Uses pygame if it's installed, and falls back to Pillow so that it works without SDL.
+    """
+    try:
+        import pygame
+    except ImportError:
+        import numpy as np
+        from PIL import Image
+        return np.asarray(Image.open(img_name).convert('RGB')).transpose(1, 0, 2)
+    return pygame.surfarray.array3d(pygame.image.load(img_name))
+
+def _colour_mask(image, colour):
+    """
+    Return a 2d bool array that is True where the pixels of image (as from _load_image_rgb) are exactly colour (an int 0xABCDEF)
+    """
+    colour = (colour // 0x10000, colour // 0x100 % 0x100, colour % 0x100)
+    return (image[:, :, 0] == colour[0]) & (image[:, :, 1] == colour[1]) & (image[:, :, 2] == colour[2])
+
 def load_obstacle_image(img_name, obstacle_colour=0xFFFFFF):
     """
     Loads a field from an image, where the obstacles are marked. PNG or BMP are the best because they're lossless
-    Requires pygame.
+    Requires numpy, and either pygame or Pillow.
 
-    Returns a field that can be used in jps. 
+    Returns a field that can be used in jps, as a 2d numpy array. 
     
     img_name - a filename for a .png or .bmp file. 
     obstacle_colour - the colour that represents obstacles in form 0xABCDEF
     """
-    import pygame
-    image = pygame.surfarray.array3d(pygame.image.load(img_name))
-    obstacle_colour = (obstacle_colour // 0x10000, obstacle_colour // 0x100 % 0x100, obstacle_colour % 0x100)
-
-    return generate_field(image, lambda x:(x!=obstacle_colour).any(), pad=True) 
+    image = _load_image_rgb(img_name)
+    return generate_field(~_colour_mask(image, obstacle_colour), pad=True) 
 
 def load_path_image(img_name, path_colour=0x000000):
     """
     Loads a field from an image where the paths are marked. PNG or BMP are the best.
     This is pretty much the oopposite of load_obstacle_image. 
-    Requires pygame.
+    Requires numpy, and either pygame or Pillow.
 
-    Returns a field that can be used in jps.
+    Returns a field that can be used in jps, as a 2d numpy array.
 
     img_name - a filename for a .png or .bmp file. 
     obstacle_colour - the colour that represents obstacles as an int
     """
-    
-    import pygame
-    image = pygame.surfarray.array3d(pygame.image.load(img_name))
-    path_colour = (path_colour // 0x10000, path_colour // 0x100 % 0x100, path_colour % 0x100)
+    image = _load_image_rgb(img_name)
+    return generate_field(_colour_mask(image, path_colour), pad=True)
 
-    return generate_field(image, lambda x:(x==path_colour).all(), pad=True)
-
-def jps(field, start_x, start_y, end_x, end_y):
+def jps(field, start_x, start_y, end_x, end_y, mode='scan', prune=True, tracer=None, queue='heap', bidirectional=False):
     """
     Run a jump point search on a field with obstacles.
     
     Parameters
-    field            - 2d array representing the cost to get to that node.
+    field            - 2d array representing the cost to get to that node, or a Grid compiled from one.
+                       Pass a Grid if you search the same map many times: a plain field is compiled on every call.
+                       If the Grid has landmarks (see Grid.preprocess_landmarks), the heuristic uses them too.
     start_x, start_y - the x, y coordinates of the starting position (must be ints)
     end_x, end_y     - the x, y coordinates of the destination (must be ints)
+    mode             - 'scan' to find jump points by walking the field cell by cell.
+                       'jps+' to jump using the tables from Grid.preprocess_jump_distances(), which is run first if needed.
+                       'bitset' to find cardinal jump points with the row and column bitsets from Grid.build_bitsets(),
+                       which is run first if needed. Fastest on large open areas, and doesn't need numpy.
+    prune            - if true (the default), remember the direction each jump point was reached from and only
+                       explore its natural and forced neighbours, as in the Harabor paper. Paths are optimal.
+                       If false, explore all 8 directions from every jump point. In 'scan' mode this is the
+                       original search, which stops scanning at any cell another scan already reached.
+    tracer           - optionally, a SearchTracer to fill in with statistics and the cells the search touched.
+    queue            - 'heap' for a binary heap (FastPriorityQueue), or 'bucket' for a BucketPriorityQueue,
+                       which never queues a jump point twice.
+    bidirectional    - if true, search from both ends at once until the two searches meet. This can expand far fewer
+                       jump points on long routes through rooms and corridors. Needs mode='scan' and prune=True.
 
     Return:
     a list of tuples corresponding to the jump points. drawing straight lines betwen them gives the path.
     OR
     [] if no path is found. 
     """
-    global expanded, visited
-    if VISUAL:
-        expanded = [[False for j in range(len(field[0]))] for i in range(len(field))]  
-        visited = [[False for j in range(len(field[0]))] for i in range(len(field))]  
+    if tracer is not None:
+        tracer._lap(None)
+    grid = field if isinstance(field, Grid) else Grid(field)
     
     # handle obvious exception cases: either start or end is unreachable
-    if field[start_x][start_y] == OBSTACLE:
+    if not grid.is_walkable(start_x, start_y):
+        raise ValueError("No path exists: the start node is not walkable")
+    if not grid.is_walkable(end_x, end_y):
+        raise ValueError("No path exists: the end node is not walkable")
+
+    start = grid.index(start_x, start_y)
+    end = grid.index(end_x, end_y)
+    if grid.components is not None and grid.components[start] != grid.components[end]:
+        raise ValueError("No path exists: the start and end nodes are not connected")
+
+    if bidirectional:
+        if mode != 'scan' or not prune:
+            raise ValueError("Bidirectional search needs mode='scan' and prune=True")
+        search = lambda pq: _jps_bidirectional(grid, start, end, pq, back_pq, tracer)
+    elif mode == 'jps+':
+        if grid.jump_distances is None:
+            grid.preprocess_jump_distances()
+        search = lambda pq: _jps_astar(grid, start, end, _table_jumper(grid, [(end_x, end_y)]), pq, prune,
+                                       grid._landmark_bounds(end))
+    elif mode == 'bitset':
+        if grid.bitsets is None:
+            grid.build_bitsets()
+        search = lambda pq: _jps_astar(grid, start, end, _bitset_jumper(grid, [(end_x, end_y)], tracer), pq, prune,
+                                       grid._landmark_bounds(end))
+    elif mode != 'scan':
+        raise ValueError("Unknown search mode: {}".format(mode))
+    elif prune:
+        search = lambda pq: _jps_astar(grid, start, end, _scan_jumper(grid, _end_stops(grid, end), tracer), pq, True,
+                                       grid._landmark_bounds(end))
+    else:
+        search = lambda pq: _jps_legacy(grid, start, end, pq)
+
+    if queue == 'heap':
+        pq, back_pq = FastPriorityQueue(), FastPriorityQueue()
+    elif queue == 'bucket':
+        pq, back_pq = BucketPriorityQueue(), BucketPriorityQueue()
+    else:
+        raise ValueError("Unknown queue: {}".format(queue))
+
+    cache = grid.path_cache if prune or mode != 'scan' else None
+    if cache is not None:
+        path = cache.get(start, end)
+        if path is not None:
+            return path
+
+    if tracer is None:
+        path = _get_path(grid, start, search(pq))
+        if cache is not None:
+            cache.put(start, end, path)
+        return path
+
+    # the same search, but timed and with the cells it touched collected afterwards
+    tracer._start(grid)
+    tracer._lap('setup')
+    pq, back_pq = _TracedQueue(pq, tracer), _TracedQueue(back_pq, tracer)
+    try:
+        found = search(pq)
+    finally:
+        tracer._lap('search')
+        if bidirectional:
+            tracer._finish(grid, [i for i, (f, b) in enumerate(zip(grid._closed, grid._backward_scratch()[3]))
+                                  if f == grid._generation or b == grid._generation])
+        elif mode == 'scan' and not prune:
+            # the original search stamps every cell it scans exactly once, and never pops a cell twice
+            tracer._visits = array('I', (g == grid._generation for g in grid._stamp))
+            tracer._finish(grid, pq.popped)
+        else:
+            tracer._finish(grid)
+        tracer._lap(None)   # collecting the cells isn't part of any phase
+    path = _get_path(grid, start, found)
+    tracer._lap('path')
+    if cache is not None:
+        cache.put(start, end, path)
+    return path
+
+def jps_targets(field, start_x, start_y, targets, mode='scan', tracer=None, queue='heap'):
+    """
+    Find the paths from one start to each of several destinations with a single search, which keeps going
+    until every destination has been reached.
+
+    Parameters
+    field            - 2d array representing the cost to get to that node, or a Grid compiled from one
+    start_x, start_y - the x, y coordinates of the starting position
+    targets          - an iterable of (x, y) destinations
+    mode, tracer, queue - as for jps(...)
+
+    Return
+    a dict from each destination to its path (a list of jump points as from jps), or [] if there is no path to it.
+    """
+    return _search_targets(field, start_x, start_y, targets, False, mode, tracer, queue)
+
+def jps_nearest(field, start_x, start_y, targets, mode='scan', tracer=None, queue='heap'):
+    """
+    Find the path to whichever of several destinations is closest, stopping as soon as it is reached.
+    The heuristic is the distance to the nearest destination, so the search heads for all of them at once.
+
+    Parameters are as for jps_targets(...).
+
+    Return
+    a tuple (destination, path). Raises ValueError if none of the destinations can be reached.
+    """
+    found = _search_targets(field, start_x, start_y, targets, True, mode, tracer, queue)
+    for target, path in found.items():
+        if path:
+            return target, path
+    raise ValueError("No path is found")
+
+def _search_targets(field, start_x, start_y, targets, nearest, mode, tracer, queue):
+    """ The shared part of jps_targets(...) and jps_nearest(...). """
+    if tracer is not None:
+        tracer._lap(None)
+    grid = field if isinstance(field, Grid) else Grid(field)
+    if not grid.is_walkable(start_x, start_y):
         raise ValueError("No path exists: the start node is not walkable")
-    if field[end_x][end_y] == OBSTACLE:
+    start = grid.index(start_x, start_y)
+
+    # destinations that can't be reached are answered without searching
+    result = {}
+    ends = []
+    for x, y in targets:
+        result[x, y] = []
+        if grid.is_walkable(x, y) and (grid.components is None or grid.components[grid.index(x, y)] == grid.components[start]):
+            ends.append((x, y))
+    if not ends:
+        return result
+
+    if queue == 'heap':
+        new_queue = FastPriorityQueue
+    elif queue == 'bucket':
+        new_queue = BucketPriorityQueue
+    else:
+        raise ValueError("Unknown queue: {}".format(queue))
+    if tracer is not None:
+        tracer._start(grid)
+        untraced = new_queue
+        new_queue = lambda: _TracedQueue(untraced(), tracer)
+
+    # a one-way search leaves the backward stamps free, so the destinations are marked there for the scans to stop at
+    generation = grid._next_generation()
+    marks = grid._backward_scratch()[2]
+    for x, y in ends:
+        marks [grid.index(x, y)] = generation
+    if mode == 'jps+':
+        if grid.jump_distances is None:
+            grid.preprocess_jump_distances()
+        jump = _table_jumper(grid, ends)
+    elif mode == 'bitset':
+        if grid.bitsets is None:
+            grid.build_bitsets()
+        jump = _bitset_jumper(grid, ends, tracer)
+    elif mode == 'scan':
+        jump = _scan_jumper(grid, (marks, generation), tracer)
+    else:
+        raise ValueError("Unknown search mode: {}".format(mode))
+    if tracer is not None:
+        tracer._lap('setup')
+
+    try:
+        found = _jps_targets(grid, start, ends, jump, new_queue, generation, nearest)
+    finally:
+        if tracer is not None:
+            tracer._lap('search')
+            tracer._finish(grid)
+            tracer._lap(None)
+    for end in found:
+        result[grid.coords(end)] = _get_path(grid, start, end)
+    if tracer is not None:
+        tracer._lap('path')
+    return result
+
+class BoundedSearch(object):
+    """
+    A jump point search that can be run a bit at a time, e.g. for a few hundred expansions per frame of a real-time
+    loop. Each call to run(...) carries on from where the last one stopped. Until the destination is found, it
+    returns the path to the jump point nearest to it (by the heuristic) reached so far, for the caller to start along.
+
+    The search keeps its state in dicts rather than in the grid's scratch arrays, so other searches can use the same
+    grid between calls. Don't change the grid's obstacles while a search is in progress.
+
+    expanded - the number of jump points expanded so far, over every call to run(...)
+    complete - whether the destination has been reached, so the last path returned is the shortest one
+    """
+    def __init__(self, field, start_x, start_y, end_x, end_y, mode='scan', queue='heap'):
+        """
+        Parameters are as for jps(...). Raises ValueError straight away if the start or end is not walkable,
+        or the grid's components (see Grid.label_components) show they aren't connected.
+        """
+        grid = field if isinstance(field, Grid) else Grid(field)
+        if not grid.is_walkable(start_x, start_y):
+            raise ValueError("No path exists: the start node is not walkable")
+        if not grid.is_walkable(end_x, end_y):
+            raise ValueError("No path exists: the end node is not walkable")
+        start = grid.index(start_x, start_y)
+        end = grid.index(end_x, end_y)
+        if grid.components is not None and grid.components[start] != grid.components[end]:
+            raise ValueError("No path exists: the start and end nodes are not connected")
+
+        if mode == 'jps+':
+            if grid.jump_distances is None:
+                grid.preprocess_jump_distances()
+            self._jump = _table_jumper(grid, [(end_x, end_y)])
+        elif mode == 'bitset':
+            if grid.bitsets is None:
+                grid.build_bitsets()
+            self._jump = _bitset_jumper(grid, [(end_x, end_y)])
+        elif mode == 'scan':
+            # the search keeps its own state so other queries can run on the grid in between, so it can't
+            # stamp the destination in the grid's scratch arrays like jps(...) does
+            marks = bytearray(grid.width * grid.height)
+            marks [end] = 1
+            self._jump = _scan_jumper(grid, (marks, 1))
+        else:
+            raise ValueError("Unknown search mode: {}".format(mode))
+        if queue == 'heap':
+            self._pq = FastPriorityQueue()
+        elif queue == 'bucket':
+            self._pq = BucketPriorityQueue()
+        else:
+            raise ValueError("Unknown queue: {}".format(queue))
+
+        self.grid = grid
+        self.start, self.end = start, end
+        self.expanded = 0
+        self.complete = False
+        self._cost = {start: 0}
+        self._sources = {start: start}
+        self._closed = set()
+        self._held = None   # a jump point popped but left unexpanded because it was over max_cost
+        h = self._heuristic(start)
+        self._nearest = (h, 0, start)   # (heuristic, cost, index) of the reached jump point nearest the destination
+        self._pq.add_task(start, (h, 0))
+
+    def _heuristic(self, node):
+        x, y = divmod(node, self.grid.height)
+        end_x, end_y = divmod(self.end, self.grid.height)
+        return max(abs(x - end_x), abs(y - end_y))
+
+    def run(self, max_expansions=None, max_cost=None, deadline=None):
+        """
+        Carry on searching until the destination is reached or a limit is hit. Limits that are None don't apply.
+
+        Parameters
+        max_expansions - expand at most this many jump points in this call
+        max_cost       - stop once every path left to try would cost more than this. Calling run(...) again
+                         with a higher max_cost carries on.
+        deadline       - stop once time.time() is past this
+
+        Return
+        a tuple (path, complete). path is a list of jump points as from jps(...): the whole path if complete is
+        true, and otherwise the path to the jump point nearest the destination reached so far.
+        Raises ValueError if every jump point has been expanded without reaching the destination.
+        """
+        if self.complete:
+            return self._path(self.end), True
+
+        height, end = self.grid.height, self.end
+        end_x, end_y = divmod(end, height)
+        walkable, jump, pq = self.grid.walkable, self._jump, self._pq
+        cost, sources, closed = self._cost, self._sources, self._closed
+        nearest = self._nearest
+        expansions = 0
+
+        while self._held is not None or not pq.empty():
+            if max_expansions is not None and expansions >= max_expansions:
+                break
+            if deadline is not None and time.time() > deadline:
+                break
+            if self._held is not None:
+                p, self._held = self._held, None
+            else:
+                p = pq.pop_task()
+                if p in closed:
+                    continue  # already expanded through a cheaper route
+            pX, pY = divmod(p, height)
+            if max_cost is not None and cost [p] + max(abs(pX - end_x), abs(pY - end_y)) > max_cost:
+                self._held = p
+                break
+            closed.add(p)
+            if p == end:
+                self.complete = True
+                return self._path(end), True
+            expansions += 1
+
+            sX, sY = divmod(sources [p], height)
+            for directionX, directionY in _pruned_directions(walkable, p, _signum(pX - sX), _signum(pY - sY), height):
+                found = jump(p, directionX, directionY)
+                if found is None:
+                    continue
+                node, steps = found
+                node_cost = cost [p] + steps
+                if node not in cost or node_cost < cost [node]:
+                    cost [node] = node_cost
+                    sources [node] = p
+                    nX, nY = divmod(node, height)
+                    h = max(abs(nX - end_x), abs(nY - end_y))
+                    pq.add_task(node, (node_cost + h, -node_cost))
+                    if (h, node_cost) < nearest[:2]:
+                        nearest = (h, node_cost, node)
+        else:
+            self.expanded += expansions
+            raise ValueError("No path is found")
+
+        self.expanded += expansions
+        self._nearest = nearest
+        return self._path(nearest[2]), False
+
+    def _path(self, node):
+        result = []
+        cur = node
+        while cur != self.start:
+            result.append(self.grid.coords(cur))
+            cur = self._sources [cur]
+        result.reverse()
+        return [self.grid.coords(self.start)] + result
+
+def jps_bounded(field, start_x, start_y, end_x, end_y, max_expansions=None, max_cost=None, deadline=None,
+                mode='scan', queue='heap'):
+    """
+    Run a jump point search with limits on how much work it may do. See BoundedSearch to spread one search
+    over several calls instead.
+
+    Parameters
+    field, start_x, start_y, end_x, end_y, mode, queue - as for jps(...)
+    max_expansions, max_cost, deadline                  - as for BoundedSearch.run(...)
+
+    Return
+    a tuple (path, complete): the shortest path and True, or if a limit was hit first, the path to the
+    jump point nearest the destination that was reached, and False.
+    """
+    search = BoundedSearch(field, start_x, start_y, end_x, end_y, mode, queue)
+    return search.run(max_expansions, max_cost, deadline)
+
+def flow_field(field, end_x, end_y):
+    """
+    Find the distance to one destination from every cell at once, and which way to step from each cell to get
+    closer, with the same movement rules as jps(...). Many agents heading to the same place can then each look up
+    their next move in O(1): DIRECTIONS[directions[x, y]]. The arrays stay valid until the map changes.
+    Requires numpy.
+
+    Parameters
+    field        - 2d array representing the cost to get to that node, or a Grid compiled from one
+    end_x, end_y - the x, y coordinates of the destination
+
+    Return
+    a tuple of two numpy arrays (distances, directions), indexed [x, y] like the field.
+    distances  - the number of steps to the destination, or -1 where it can't be reached (and at obstacles)
+    directions - int8 indices into DIRECTIONS of the first step of a shortest path, or -1 at the destination
+                 and where it can't be reached
+    """
+    import numpy as np
+
+    grid = field if isinstance(field, Grid) else Grid(field)
+    if not grid.is_walkable(end_x, end_y):
         raise ValueError("No path exists: the end node is not walkable")
 
-    try: 
-        import queue 
-    except:
-        import Queue as queue # python 2 compatibility
+    # pad the grid with a ring of obstacles so that neighbour indices never run off the edge
+    width, height = grid.width + 2, grid.height + 2
+    walkable = np.zeros((width, height), dtype=bool)
+    walkable[1:-1, 1:-1] = np.frombuffer(bytes(grid.walkable), dtype=np.uint8).reshape(grid.width, grid.height)
+    walkable = walkable.ravel()
+
+    distances = np.full(width * height, -1, dtype=np.int16 if width * height < 2 ** 15 else np.int32)
+    directions = np.full(width * height, -1, dtype=np.int8)
+    steps = np.array([dx * height + dy for dx, dy in DIRECTIONS])
+    # a cell reached from its neighbour in direction d steps back in the opposite direction
+    back = np.array([DIRECTIONS.index((-dx, -dy)) for dx, dy in DIRECTIONS], dtype=np.int8)
+
+    # breadth-first search out from the destination, one ring of cells at a time, since every step costs 1
+    frontier = np.array([(end_x + 1) * height + end_y + 1])
+    distances[frontier] = 0
+    distance = 0
+    while frontier.size:
+        distance += 1
+        reached = (frontier[:, None] + steps).ravel()
+        direction = np.tile(np.arange(len(DIRECTIONS)), frontier.size)
+        new = walkable[reached] & (distances[reached] < 0)
+        frontier, first = np.unique(reached[new], return_index=True)
+        distances[frontier] = distance
+        directions[frontier] = back[direction[new][first]]
+
+    return (distances.reshape(width, height)[1:-1, 1:-1].copy(),
+            directions.reshape(width, height)[1:-1, 1:-1].copy())
+
+def _jps_legacy(grid, start, end, pq):
+    """
+    The original search, which explores all 8 directions from every jump point and stops scanning at any cell
+    that another scan has reached. jps(..., prune=False) calls this after checking that start and end are walkable.
+
+    Parameters
+    grid       - the Grid to search
+    start, end - indices of the starting position and destination
+    pq         - an empty FastPriorityQueue to use
+
+    Return
+    end, once a path has been found. The path can be read back with _get_path(...).
+    """
+    height = grid.height
+    end_x, end_y = grid.coords(end)
 
     class FoundPath(Exception):
         """ Raise this when you found a path. it's not really an error,
@@ -168,190 +1548,948 @@ def jps(field, start_x, start_y, end_x, end_y):
         Also check whether the search is finished.
 
         Parameters
-        pq - a priority queue for the jump point search
-        node - 2-tuple with the coordinates of a point to add.
+        node - index of a point to add.
 
         Return
         None
         """
         if node is not None:
-            pq.add_task (node, field [node[0]] [node[1]] + max(abs(node[0] - end_x), abs(node[1] - end_y)))
+            x, y = divmod(node, height)
+            pq.add_task (node, cost [node] + max(abs(x - end_x), abs(y - end_y)))
 
             
-    def _jps_explore_diagonal (startX, startY, directionX, directionY):
+    def _jps_explore_diagonal (start, directionX, directionY):
         """
-        Explores field along the diagonal direction for JPS, starting at point (startX, startY)
+        Explores field along the diagonal direction for JPS, starting at index start
 
         Parameters
-        startX, startY - the coordinates to start exploring from. 
+        start - the index to start exploring from. 
         directionX, directionY - an element from: {(1, 1), (-1, 1), (-1, -1), (1, -1)} corresponding to the x and y directions respectively. 
 
         Return
-        A 2-tuple containing the coordinates of the jump point if it found one
+        The index of the jump point if it found one
         None if no jumppoint was found. 
         """
-        cur_x, cur_y = startX, startY #indices of current cell. 
-        curCost = field [startX] [startY]
+        step_x = directionX * height
+        step = step_x + directionY
+        cur = start #index of current cell. 
+        curCost = cost [start]
 
         while (True):
-            cur_x += directionX
-            cur_y += directionY
+            cur += step
             curCost += 1
 
-            if field [cur_x] [cur_y] == UNINITIALIZED:
-                field [cur_x] [cur_y] = curCost
-                sources [cur_x] [cur_y] = startX, startY
-                if VISUAL:
-                    visited [cur_x][cur_y] = True
-            elif cur_x == end_x and cur_y == end_y:  # destination found
-                field [cur_x][cur_y] = curCost
-                sources [cur_x] [cur_y] = startX, startY
-                if VISUAL:
-                    visited[cur_x][cur_y] = True
+            if walkable [cur] and stamp [cur] != generation and cur != end:
+                stamp [cur] = generation
+                cost [cur] = curCost
+                sources [cur] = start
+            elif cur == end:  # destination found
+                cost [cur] = curCost
+                sources [cur] = start
                 raise FoundPath()
-            else: #collided with an obstacle. We are done. 
+            else: #collided with an obstacle or previously explored part. We are done. 
                 return None
 
             # If a jump point is found, 
-            if field [cur_x + directionX] [cur_y] == OBSTACLE and field [cur_x + directionX] [cur_y + directionY] != OBSTACLE:
-                return (cur_x, cur_y)
+            if not walkable [cur + step_x] and walkable [cur + step]:
+                return cur
             else: #otherwise, extend a horizontal "tendril" to probe the field.
-                queue_jumppoint(_jps_explore_cardinal (cur_x, cur_y, directionX, 0))
+                queue_jumppoint(_jps_explore_cardinal (cur, step_x, 1))
 
-            if field [cur_x] [cur_y + directionY] == OBSTACLE and field [cur_x + directionX] [cur_y + directionY] != OBSTACLE:
-                return (cur_x, cur_y)
+            if not walkable [cur + directionY] and walkable [cur + step]:
+                return cur
             else: #extend a vertical search to look for anything 
-                queue_jumppoint(_jps_explore_cardinal (cur_x, cur_y, 0, directionY))
+                queue_jumppoint(_jps_explore_cardinal (cur, directionY, height))
 
-    def _jps_explore_cardinal (startX, startY, directionX, directionY):
+    def _jps_explore_cardinal (start, step, side):
         """
-        Explores field along a cardinal direction for JPS (north/east/south/west), starting at point (startX, startY)
+        Explores field along a cardinal direction for JPS (north/east/south/west), starting at index start
 
         Parameters
-        startX, startY - the coordinates to start exploring from. 
-        directionX, directionY - an element from: {(1, 1), (-1, 1), (-1, -1), (1, -1)} corresponding to the x and y directions respectively. 
+        start - the index to start exploring from. 
+        step - the change in index for one step in the direction of travel: one of {height, -height, 1, -1}
+        side - the change in index for one step perpendicular to the direction of travel: 1 if moving along x, height if moving along y.
 
         Result: 
-        A 2-tuple containing the coordinates of the jump point if it found one
+        The index of the jump point if it found one
         None if no jumppoint was found.
         """
-        cur_x, cur_y = startX, startY #indices of current cell. 
-        curCost = field [startX] [startY]
+        cur = start #index of current cell. 
+        curCost = cost [start]
 
         while (True):
-            cur_x += directionX
-            cur_y += directionY
+            cur += step
             curCost += 1
 
-            if field [cur_x] [cur_y] == UNINITIALIZED:
-                field [cur_x][cur_y] = curCost
-                sources [cur_x] [cur_y] = startX, startY
-                if VISUAL:
-                    visited[cur_x][cur_y] = True  
-            elif cur_x == end_x and cur_y == end_y:  # destination found
-                field [cur_x][cur_y] = curCost
-                sources [cur_x] [cur_y] = startX, startY
-                if VISUAL:
-                    visited[cur_x][cur_y] = True
+            if walkable [cur] and stamp [cur] != generation and cur != end:
+                stamp [cur] = generation
+                cost [cur] = curCost
+                sources [cur] = start
+            elif cur == end:  # destination found
+                cost [cur] = curCost
+                sources [cur] = start
                 raise FoundPath()
             else: #collided with an obstacle or previously explored part. We are done. 
                 return None
 
-            #check neighbouring cells, i.e. check if cur_x, cur_y is a jump point. 
-            if directionX == 0: 
-                if field [cur_x + 1] [cur_y] == OBSTACLE and field [cur_x + 1] [cur_y + directionY] != OBSTACLE:
-                    return cur_x, cur_y
-                if field [cur_x - 1] [cur_y] == OBSTACLE and field [cur_x - 1] [cur_y + directionY] != OBSTACLE:
-                    return cur_x, cur_y
-            elif directionY == 0:
-                if field [cur_x] [cur_y + 1] == OBSTACLE and field [cur_x + directionX] [cur_y + 1] != OBSTACLE:
-                    return cur_x, cur_y
-                if field [cur_x] [cur_y - 1] == OBSTACLE and field [cur_x + directionX] [cur_y - 1] != OBSTACLE:
-                    return cur_x, cur_y
+            #check neighbouring cells, i.e. check if cur is a jump point. 
+            if not walkable [cur + side] and walkable [cur + side + step]:
+                return cur
+            if not walkable [cur - side] and walkable [cur - side + step]:
+                return cur
 
     # MAIN JPS FUNCTION
-    field = [[j for j in i] for i in field]  # this takes less time than deep copying. 
-
-    # Initialize some arrays and certain elements. 
-    sources = [[(None, None) for i in field[0]] for j in field]  # the jump-point predecessor to each point.
-    field [start_x] [start_y] = 0
-    field [end_x] [end_y] = DESTINATION
+    # Bind the grid's arrays locally. Nothing is copied: stale scratch values are ignored by generation.
+    generation = grid._next_generation()
+    walkable, cost, sources, stamp = grid.walkable, grid._cost, grid._source, grid._stamp
 
-    pq = FastPriorityQueue()
-    queue_jumppoint((start_x, start_y))
+    stamp [start] = generation
+    cost [start] = 0
+    queue_jumppoint(start)
 
     # Main loop: iterate through the queue
     while (not pq.empty()):
-        pX, pY = pq.pop_task()
+        p = pq.pop_task()
 
-        if VISUAL:
-            expanded[pX][pY] = True 
-        
         try:
-            queue_jumppoint(_jps_explore_cardinal (pX, pY, 1, 0))
-            queue_jumppoint(_jps_explore_cardinal (pX, pY, -1, 0))
-            queue_jumppoint(_jps_explore_cardinal (pX, pY, 0, 1))
-            queue_jumppoint(_jps_explore_cardinal (pX, pY, 0, -1))
-
-            queue_jumppoint(_jps_explore_diagonal (pX, pY, 1, 1))
-            queue_jumppoint(_jps_explore_diagonal (pX, pY, 1, -1))
-            queue_jumppoint(_jps_explore_diagonal (pX, pY, -1, 1))
-            queue_jumppoint(_jps_explore_diagonal (pX, pY, -1, -1))
+            queue_jumppoint(_jps_explore_cardinal (p, height, 1))
+            queue_jumppoint(_jps_explore_cardinal (p, -height, 1))
+            queue_jumppoint(_jps_explore_cardinal (p, 1, height))
+            queue_jumppoint(_jps_explore_cardinal (p, -1, height))
+
+            queue_jumppoint(_jps_explore_diagonal (p, 1, 1))
+            queue_jumppoint(_jps_explore_diagonal (p, 1, -1))
+            queue_jumppoint(_jps_explore_diagonal (p, -1, 1))
+            queue_jumppoint(_jps_explore_diagonal (p, -1, -1))
         except FoundPath:
-            return _get_path(sources, start_x, start_y, end_x, end_y)
+            return end
 
     raise ValueError("No path is found")
-    #end of jps
     
 
-def _get_path(sources, start_x, start_y, end_x, end_y):
+def _jps_astar(grid, start, end, jump, pq, prune=True, landmarks=()):
     """
-    Reconstruct the path from the source information as given by jps(...).
+    A* over the jump points. jps(...) calls this after checking that start and end are walkable.
 
     Parameters
-    sources          - a 2d array of the predecessor to each node
-    start_x, start_y - the x, y coordinates of the starting position
-    end_x, end_y     - the x, y coordinates of the destination
+    grid       - the Grid to search
+    start, end - indices of the starting position and destination
+    jump       - a function (index, directionX, directionY) -> (jump point index, number of steps) or None,
+                 e.g. from _scan_jumper(...) or _table_jumper(...)
+    pq         - an empty FastPriorityQueue to use
+    prune      - if true, only follow the natural and forced neighbours of the direction each jump point
+                 was reached from (Harabor & Grastien). If not, follow all 8 directions from every jump point.
+    landmarks  - optionally, (distance table, distance to end) pairs from Grid._landmark_bounds(...), to raise the
+                 Chebyshev heuristic to the best landmark lower bound
+
+    Return
+    end, once a path has been found. The path can be read back with _get_path(...).
+    """
+    height = grid.height
+    end_x, end_y = grid.coords(end)
+    generation = grid._next_generation()
+    walkable, cost, sources, stamp, closed = grid.walkable, grid._cost, grid._source, grid._stamp, grid._closed
+
+    stamp [start] = generation
+    cost [start] = 0
+    sources [start] = start
+
+    start_x, start_y = grid.coords(start)
+    h = max(abs(start_x - end_x), abs(start_y - end_y))
+    for table, to_end in landmarks:
+        if table [start] >= 0 and abs(table [start] - to_end) > h:
+            h = abs(table [start] - to_end)
+    pq.add_task(start, (h, 0))
+
+    while (not pq.empty()):
+        p = pq.pop_task()
+        if closed [p] == generation:
+            continue  # already expanded through a cheaper route
+        closed [p] = generation
+        if p == end:
+            return end
+
+        pX, pY = divmod(p, height)
+        if prune:
+            sX, sY = divmod(sources [p], height)
+            directions = _pruned_directions(walkable, p, _signum(pX - sX), _signum(pY - sY), height)
+        else:
+            directions = DIRECTIONS
+
+        for directionX, directionY in directions:
+            found = jump(p, directionX, directionY)
+            if found is None:
+                continue
+            node, steps = found
+            node_cost = cost [p] + steps
+            if stamp [node] != generation or node_cost < cost [node]:
+                stamp [node] = generation
+                cost [node] = node_cost
+                sources [node] = p
+                nX, nY = divmod(node, height)
+                h = max(abs(nX - end_x), abs(nY - end_y))
+                for table, to_end in landmarks:
+                    distance = table [node]
+                    if distance >= 0 and abs(distance - to_end) > h:
+                        h = abs(distance - to_end)
+                pq.add_task(node, (node_cost + h, -node_cost))
+
+    raise ValueError("No path is found")
+
+def _jps_bidirectional(grid, start, end, pq, back_pq, tracer=None):
+    """
+    Bidirectional A* over the jump points: a forward search from start towards end, and a backward search from end
+    towards start in the grid's backward scratch arrays. Each step expands one jump point from whichever half has
+    fewer queued.
+    jps(..., bidirectional=True) calls this after checking that start and end are walkable.
+
+    Each half's scans also stop at any cell the other half has reached, so the two meet as soon as a scan touches
+    the other's jump points. Every cell reached by both gives a path; the cheapest so far costs best. It is only
+    accepted once either half pops a jump point whose f cost (its cost plus the heuristic towards its own goal) is
+    at least best: f never overestimates, so no path through that half's open jump points can be cheaper.
+
+    Parameters
+    grid        - the Grid to search
+    start, end  - indices of the starting position and destination
+    pq, back_pq - empty priority queues for the forward and backward halves
+    tracer      - optionally, a SearchTracer to count the scanned cells in
+
+    Return
+    end, once a path has been found. The backward half's chain of jump points is written into the forward
+    source array, so the whole path can be read back with _get_path(...).
+    """
+    height = grid.height
+    generation = grid._next_generation()
+    walkable = grid.walkable
+    back_cost, back_sources, back_stamp, back_closed = grid._backward_scratch()
+    cost, sources, stamp, closed = grid._cost, grid._source, grid._stamp, grid._closed
+
+    halves = ((cost, sources, stamp, closed, grid.coords(end), pq, back_cost, back_stamp,
+               _scan_jumper(grid, (back_stamp, generation), tracer)),
+              (back_cost, back_sources, back_stamp, back_closed, grid.coords(start), back_pq, cost, stamp,
+               _scan_jumper(grid, (stamp, generation), tracer)))
+    for origin, (here_cost, here_sources, here_stamp, _, (goal_x, goal_y), queue, _, _, _) in zip((start, end), halves):
+        here_stamp [origin] = generation
+        here_cost [origin] = 0
+        here_sources [origin] = origin
+        x, y = divmod(origin, height)
+        queue.add_task(origin, (max(abs(x - goal_x), abs(y - goal_y)), 0))
+
+    best, meeting = (0, start) if start == end else (None, None)
+    while not (pq.empty() and back_pq.empty()):
+        if pq.empty() or back_pq.empty():
+            if best is None:
+                break   # one half has run out of jump points without reaching the other, so there's no path
+        # expand the half with the smaller frontier: if one end is boxed in, that half can finish on its own
+        here_cost, here_sources, here_stamp, here_closed, (goal_x, goal_y), queue, there_cost, there_stamp, jump = \
+            halves[0 if back_pq.empty() or (not pq.empty() and len(pq) <= len(back_pq)) else 1]
+        p = queue.pop_task()
+        if here_closed [p] == generation:
+            continue  # already expanded through a cheaper route
+
+        pX, pY = divmod(p, height)
+        if best is not None and here_cost [p] + max(abs(pX - goal_x), abs(pY - goal_y)) >= best:
+            break
+        here_closed [p] = generation
+
+        sX, sY = divmod(here_sources [p], height)
+        for directionX, directionY in _pruned_directions(walkable, p, _signum(pX - sX), _signum(pY - sY), height):
+            found = jump(p, directionX, directionY)
+            if found is None:
+                continue
+            node, steps = found
+            node_cost = here_cost [p] + steps
+            if here_stamp [node] != generation or node_cost < here_cost [node]:
+                here_stamp [node] = generation
+                here_cost [node] = node_cost
+                here_sources [node] = p
+                nX, nY = divmod(node, height)
+                queue.add_task(node, (node_cost + max(abs(nX - goal_x), abs(nY - goal_y)), -node_cost))
+                if there_stamp [node] == generation and (best is None or node_cost + there_cost [node] < best):
+                    best, meeting = node_cost + there_cost [node], node
+
+    if best is None:
+        raise ValueError("No path is found")
+
+    # hang the backward chain from the meeting point onto the forward one
+    cur = meeting
+    while cur != end:
+        sources [back_sources [cur]] = cur
+        cur = back_sources [cur]
+    return end
+
+def _jps_targets(grid, start, ends, jump, new_queue, generation, nearest=False):
+    """
+    A* over the jump points towards several destinations at once. The heuristic is the distance to the nearest
+    destination not reached yet: it never overestimates the distance to any of them, and it is consistent, so each
+    destination has its shortest cost when it is popped. Whenever one is reached, the open jump points are queued
+    again with the new heuristic, so the search heads for the rest instead of spreading out from the ones it has.
+
+    Parameters
+    grid       - the Grid to search
+    start      - index of the starting position
+    ends       - a list of the (x, y) coordinates of the destinations
+    jump       - a jump function that stops at every destination, as for _jps_astar(...)
+    new_queue  - a function returning an empty priority queue
+    generation - the generation for this search, already started with grid._next_generation()
+    nearest    - if true, stop at the first destination popped. If not, keep going until all of them are.
+
+    Return
+    a list of the indices of the destinations reached. Their paths can be read back with _get_path(...).
+    """
+    height = grid.height
+    walkable, cost, sources, stamp, closed = grid.walkable, grid._cost, grid._source, grid._stamp, grid._closed
+    remaining = dict((grid.index(x, y), (x, y)) for x, y in ends)
+    frontier = {}   # open jump point -> (heuristic, the destination it was measured to)
+    found = []
+
+    def heuristic(node):
+        """ The distance from node to the nearest remaining destination, and that destination """
+        x, y = divmod(node, height)
+        best = None
+        for end in remaining.values():
+            distance = max(abs(x - end[0]), abs(y - end[1]))
+            if best is None or distance < best:
+                best, nearest_end = distance, end
+        return best, nearest_end
+
+    stamp [start] = generation
+    cost [start] = 0
+    sources [start] = start
+    frontier [start] = heuristic(start)
+    pq = new_queue()
+    pq.add_task(start, (frontier [start][0], 0))
+
+    while (not pq.empty()):
+        p = pq.pop_task()
+        if closed [p] == generation:
+            continue  # already expanded through a cheaper route
+        closed [p] = generation
+        del frontier [p]
+        if p in remaining:
+            found.append(p)
+            reached = remaining.pop(p)
+            if nearest or not remaining:
+                break
+            # only the jump points that were measured to this destination need a new heuristic
+            pq = new_queue()
+            for node, (h, end) in frontier.items():
+                if end == reached:
+                    h, end = frontier [node] = heuristic(node)
+                pq.add_task(node, (cost [node] + h, -cost [node]))
+
+        pX, pY = divmod(p, height)
+        sX, sY = divmod(sources [p], height)
+        for directionX, directionY in _pruned_directions(walkable, p, _signum(pX - sX), _signum(pY - sY), height):
+            found_jump = jump(p, directionX, directionY)
+            if found_jump is None:
+                continue
+            node, steps = found_jump
+            node_cost = cost [p] + steps
+            if stamp [node] != generation or node_cost < cost [node]:
+                stamp [node] = generation
+                cost [node] = node_cost
+                sources [node] = p
+                if node not in frontier:
+                    frontier [node] = heuristic(node)
+                pq.add_task(node, (node_cost + frontier [node][0], -node_cost))
+
+    return found
+
+def _pruned_directions(walkable, p, directionX, directionY, height):
+    """
+    The directions worth exploring from a jump point, given the direction it was reached from:
+    its natural neighbours, plus the forced neighbours created by obstacles beside it.
+
+    Parameters
+    walkable                - the grid's walkability array
+    p                       - index of the jump point
+    directionX, directionY  - the direction of travel into p, or (0, 0) for the start node
+    height                  - the grid's height
+
+    Return
+    a sequence of (x, y) directions
+    """
+    if directionX == 0 and directionY == 0:
+        return DIRECTIONS
+    if directionY == 0:
+        result = [(directionX, 0)]
+        if not walkable [p + 1]:
+            result.append((directionX, 1))
+        if not walkable [p - 1]:
+            result.append((directionX, -1))
+    elif directionX == 0:
+        result = [(0, directionY)]
+        if not walkable [p + height]:
+            result.append((1, directionY))
+        if not walkable [p - height]:
+            result.append((-1, directionY))
+    else:
+        result = [(directionX, 0), (0, directionY), (directionX, directionY)]
+        if not walkable [p - directionX * height]:
+            result.append((-directionX, directionY))
+        if not walkable [p - directionY]:
+            result.append((directionX, -directionY))
+    return result
+
+def _scan_jumper(grid, stops, tracer=None):
+    """
+    Make a jump function for _jps_astar(...) that finds jump points by walking the grid cell by cell.
+
+    Parameters
+    grid   - the Grid being searched
+    stops  - (stamp array, generation): the scans stop at every cell whose stamp is generation, as well as at jump
+             points. For a single destination, that is just the destination (see _end_stops), but it can be every
+             destination of a one-to-many search, or the cells the other half of a bidirectional search has reached.
+    tracer - optionally, a SearchTracer to count the scanned cells in. Without one, the scanning loops do nothing extra.
+
+    Return
+    a function (index, directionX, directionY) -> (jump point index, number of steps) or None
+    """
+    walkable, height = grid.walkable, grid.height
+    other, generation = stops
+
+    if tracer is None:
+        def jump_cardinal(start, step, side):
+            """ Walk from start in steps of step until a wall (None), a stop or a forced neighbour. """
+            cur = start
+            while (True):
+                cur += step
+                if not walkable [cur]:
+                    return None
+                if other [cur] == generation:
+                    return cur
+                if not walkable [cur + side] and walkable [cur + side + step]:
+                    return cur
+                if not walkable [cur - side] and walkable [cur - side + step]:
+                    return cur
+
+        def jump_diagonal(start, step_x, directionY):
+            """ Walk diagonally from start until a wall (None) or a jump point. Return the index and number of steps. """
+            step = step_x + directionY
+            cur = start
+            steps = 0
+            while (True):
+                cur += step
+                steps += 1
+                if not walkable [cur]:
+                    return None
+                if other [cur] == generation:
+                    return cur, steps
+                # forced neighbours behind the direction of travel
+                if not walkable [cur - step_x] and walkable [cur - step_x + directionY]:
+                    return cur, steps
+                if not walkable [cur - directionY] and walkable [cur + step_x - directionY]:
+                    return cur, steps
+                # a jump point along either cardinal component makes this cell a jump point too
+                if jump_cardinal(cur, step_x, 1) is not None or jump_cardinal(cur, directionY, height) is not None:
+                    return cur, steps
+    else:
+        # the same loops, counting each cell they step on
+        visits = tracer._visits
+
+        def jump_cardinal(start, step, side):
+            cur = start
+            while (True):
+                cur += step
+                if not walkable [cur]:
+                    return None
+                visits [cur] += 1
+                if other [cur] == generation:
+                    return cur
+                if not walkable [cur + side] and walkable [cur + side + step]:
+                    return cur
+                if not walkable [cur - side] and walkable [cur - side + step]:
+                    return cur
+
+        def jump_diagonal(start, step_x, directionY):
+            step = step_x + directionY
+            cur = start
+            steps = 0
+            while (True):
+                cur += step
+                steps += 1
+                if not walkable [cur]:
+                    return None
+                visits [cur] += 1
+                if other [cur] == generation:
+                    return cur, steps
+                if not walkable [cur - step_x] and walkable [cur - step_x + directionY]:
+                    return cur, steps
+                if not walkable [cur - directionY] and walkable [cur + step_x - directionY]:
+                    return cur, steps
+                if jump_cardinal(cur, step_x, 1) is not None or jump_cardinal(cur, directionY, height) is not None:
+                    return cur, steps
+
+    def jump(start, directionX, directionY):
+        if directionX == 0 or directionY == 0:
+            step = directionX * height + directionY
+            cur = jump_cardinal(start, step, height if directionX == 0 else 1)
+            if cur is None:
+                return None
+            return cur, (cur - start) // step
+        return jump_diagonal(start, directionX * height, directionY)
+
+    return jump
+
+def _end_stops(grid, end):
+    """
+    The stops for _scan_jumper(...) of a search for a single destination: a fresh generation stamped at end in the
+    backward stamps, which a one-way search leaves free. Call it before the search starts its own generation.
+    """
+    generation = grid._next_generation()
+    marks = grid._backward_scratch()[2]
+    marks [end] = generation
+    return marks, generation
+
+def _bitset_jumper(grid, ends, tracer=None):
+    """
+    Make a jump function for _jps_astar(...) that finds cardinal jump points with the grid's bitsets
+    (see Grid.build_bitsets). Diagonal scans still step cell by cell, but the two cardinal scans from each
+    cell are bitset lookups.
+
+    Parameters
+    grid   - the Grid being searched. Its bitsets must already be built.
+    ends   - a list of the (x, y) coordinates of the destinations, where the scans stop too
+    tracer - optionally, a SearchTracer to count the scanned cells in. Without one, the lookups do nothing extra.
+
+    Return
+    a function (index, directionX, directionY) -> (jump point index, number of steps) or None
+    """
+    walkable, height, width = grid.walkable, grid.height, grid.width
+    column_stops, row_stops = grid.bitsets
+    # the destinations as bitsets too: the ys of the destinations in each column, and the xs in each row
+    column_ends, row_ends = {}, {}
+    for end_x, end_y in ends:
+        column_ends [end_x] = column_ends.get(end_x, 0) | (1 << end_y)
+        row_ends [end_y] = row_ends.get(end_y, 0) | (1 << end_x)
+    targets = set(end_x * height + end_y for end_x, end_y in ends)
+
+    def column_stop(x, y, directionY):
+        """ The y where a scan along column x from y stops at a destination or a forced neighbour, or None at a wall. """
+        ahead, behind = column_stops [x]
+        extra = column_ends.get(x)
+        if directionY > 0:
+            mask = ahead >> (y + 1)
+            stop = y + (mask & -mask).bit_length()
+            if extra:
+                mask = extra >> (y + 1)
+                if mask:
+                    stop = min(stop, y + (mask & -mask).bit_length())
+        else:
+            stop = (behind & ((1 << y) - 1)).bit_length() - 1
+            if extra:
+                stop = max(stop, (extra & ((1 << y) - 1)).bit_length() - 1)
+        return stop if 0 <= stop < height and walkable [x * height + stop] else None
+
+    def row_stop(x, y, directionX):
+        """ The same along row y from x: the x where the scan stops, or None. """
+        ahead, behind = row_stops [y]
+        extra = row_ends.get(y)
+        if directionX > 0:
+            mask = ahead >> (x + 1)
+            stop = x + (mask & -mask).bit_length()
+            if extra:
+                mask = extra >> (x + 1)
+                if mask:
+                    stop = min(stop, x + (mask & -mask).bit_length())
+        else:
+            stop = (behind & ((1 << x) - 1)).bit_length() - 1
+            if extra:
+                stop = max(stop, (extra & ((1 << x) - 1)).bit_length() - 1)
+        return stop if 0 <= stop < width and walkable [stop * height + y] else None
+
+    if tracer is None:
+        def jump_diagonal(start, directionX, directionY):
+            """ Walk diagonally from start until a wall (None) or a jump point. Return the index and number of steps. """
+            step_x = directionX * height
+            step = step_x + directionY
+            cur = start
+            x, y = divmod(start, height)
+            steps = 0
+            while (True):
+                cur += step
+                x += directionX
+                y += directionY
+                steps += 1
+                if not walkable [cur]:
+                    return None
+                if cur in targets:
+                    return cur, steps
+                if not walkable [cur - step_x] and walkable [cur - step_x + directionY]:
+                    return cur, steps
+                if not walkable [cur - directionY] and walkable [cur + step_x - directionY]:
+                    return cur, steps
+                if row_stop(x, y, directionX) is not None or column_stop(x, y, directionY) is not None:
+                    return cur, steps
+    else:
+        # the same lookups, counting each cell the scans they replace would have stepped on
+        visits = tracer._visits
+        column_lookup, row_lookup = column_stop, row_stop
+
+        def column_stop(x, y, directionY):
+            stop = column_lookup(x, y, directionY)
+            i = y + directionY
+            while i != stop and 0 <= i < height and walkable [x * height + i]:
+                visits [x * height + i] += 1
+                i += directionY
+            if stop is not None:
+                visits [x * height + stop] += 1
+            return stop
+
+        def row_stop(x, y, directionX):
+            stop = row_lookup(x, y, directionX)
+            i = x + directionX
+            while i != stop and 0 <= i < width and walkable [i * height + y]:
+                visits [i * height + y] += 1
+                i += directionX
+            if stop is not None:
+                visits [stop * height + y] += 1
+            return stop
+
+        def jump_diagonal(start, directionX, directionY):
+            step_x = directionX * height
+            step = step_x + directionY
+            cur = start
+            x, y = divmod(start, height)
+            steps = 0
+            while (True):
+                cur += step
+                x += directionX
+                y += directionY
+                steps += 1
+                if not walkable [cur]:
+                    return None
+                visits [cur] += 1
+                if cur in targets:
+                    return cur, steps
+                if not walkable [cur - step_x] and walkable [cur - step_x + directionY]:
+                    return cur, steps
+                if not walkable [cur - directionY] and walkable [cur + step_x - directionY]:
+                    return cur, steps
+                if row_stop(x, y, directionX) is not None or column_stop(x, y, directionY) is not None:
+                    return cur, steps
+
+    def jump(start, directionX, directionY):
+        if directionX == 0:
+            x, y = divmod(start, height)
+            stop = column_stop(x, y, directionY)
+            return None if stop is None else (start + stop - y, abs(stop - y))
+        if directionY == 0:
+            x, y = divmod(start, height)
+            stop = row_stop(x, y, directionX)
+            return None if stop is None else (start + (stop - x) * height, abs(stop - x))
+        return jump_diagonal(start, directionX, directionY)
+
+    return jump
+
+def _table_jumper(grid, ends):
+    """
+    Make a jump function for _jps_astar(...) that jumps in O(1) with the grid's JPS+ tables
+    (see Grid.preprocess_jump_distances).
+
+    Parameters
+    grid - the Grid being searched. Its tables must already be computed.
+    ends - a list of the (x, y) coordinates of the destinations
+
+    Return
+    a function (index, directionX, directionY) -> (jump point index, number of steps) or None
+    """
+    height = grid.height
+    tables = dict(zip(DIRECTIONS, grid.jump_distances))
+
+    def jump(p, directionX, directionY):
+        distance = tables [directionX, directionY] [p]
+        steps = distance if distance > 0 else None
+        reach = abs(distance)
+        pX, pY = divmod(p, height)
+        for end_x, end_y in ends:
+            gx, gy = end_x - pX, end_y - pY    # offset to the destination
+            if directionX == 0 or directionY == 0:
+                # cardinal: stop at the destination if it lies on this line before the next jump point or wall
+                if (gy if directionY == 0 else gx) != 0:
+                    continue
+                along = gx * directionX + gy * directionY
+            else:
+                # diagonal: stop where the destination's row or column is crossed, if it's in reach
+                along = min(gx * directionX, gy * directionY)
+            if 0 < along <= reach and (steps is None or along < steps):
+                steps = along
+        if steps is None:
+            return None
+        return p + steps * (directionX * height + directionY), steps
+
+    return jump
+
+def _get_path(grid, start, end):
+    """
+    Reconstruct the path from the source information that jps(...) left in the grid.
+
+    Parameters
+    grid  - the Grid that was just searched
+    start - index of the starting position
+    end   - index of the destination
     
     Return
     a list of jump points as 2-tuples (coordinates) starting from the start node and finishing at the end node.
     """
     result = []
-    cur_x, cur_y = end_x, end_y
+    cur = end
     
-    while cur_x != start_x or cur_y != start_y:
-        result.append((cur_x, cur_y))
-        cur_x, cur_y = sources[cur_x][cur_y]
+    while cur != start:
+        result.append(grid.coords(cur))
+        cur = grid._source[cur]
     result.reverse()
-    return [(start_x, start_y)] + result
+    return [grid.coords(start)] + result
+
+def jps_many(grid, pairs, workers=None, ordered=True, chunksize=16, **options):
+    """
+    Run many searches on one grid, spread over a pool of worker processes.
+    The grid's walkability, and its JPS+ tables, component labels and landmarks if they have been computed, are put
+    in shared memory once, so the map isn't copied to each worker. Requires Python 3.8+.
+
+    Parameters
+    grid      - a Grid, a field to compile into one, or the path of a compiled map file (see Grid.save),
+                which each worker memory-maps instead
+    pairs     - an iterable of ((start_x, start_y), (end_x, end_y))
+    workers   - the number of processes. Defaults to the number of cores. With 1, the searches run in this process.
+    ordered   - if true, results come back in the same order as pairs. If not, they come back as soon as they're done.
+    chunksize - how many pairs to send to a worker at a time
+    options   - passed on to jps(...), e.g. mode='jps+'
+
+    Return
+    a generator of (pair, path) tuples, where path is the list of jump points, or [] if there is no path.
+    """
+    import multiprocessing
+    from multiprocessing import shared_memory
+
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    if isinstance(grid, str):
+        if workers <= 1:
+            grid = Grid.load(grid)
+        else:
+            # each worker maps the file itself, so there is nothing to copy
+            pool = multiprocessing.Pool(workers, initializer=_init_file_worker, initargs=(grid, options))
+            try:
+                mapper = pool.imap if ordered else pool.imap_unordered
+                for result in mapper(_worker_search, pairs, chunksize):
+                    yield result
+            finally:
+                pool.terminate()
+                pool.join()
+            return
+    if not isinstance(grid, Grid):
+        grid = Grid(grid)
+    if workers <= 1:
+        for pair in pairs:
+            yield _search_pair(grid, pair, options)
+        return
+
+    # the block is the walkability, then int32 sections laid out as in Grid.save: the JPS+ tables,
+    # the component labels, the landmark cells and the landmark distance tables, each only if it has been computed
+    tables, labels, landmarks = grid.jump_distances, grid.components, grid.landmarks
+    size = len(grid.walkable)
+    offset = size + (-size % 4)
+    sections = list(tables or ())
+    if labels is not None:
+        sections.append(labels)
+    if landmarks:
+        sections.append(array('i', [cell for cell, table in landmarks]))
+        sections.extend(table for cell, table in landmarks)
+    count = sum(len(section) for section in sections)
+    layout = (tables is not None, grid.component_count if labels is not None else None,
+              len(landmarks) if landmarks is not None else None)
+    block = shared_memory.SharedMemory(create=True, size=offset + 4 * count)
+    pool = None
+    try:
+        block.buf[:size] = grid.walkable
+        if sections:
+            shared = block.buf[offset:offset + 4 * count].cast('i')
+            k = 0
+            for section in sections:
+                shared[k:k + len(section)] = array('i', section)
+                k += len(section)
+            shared.release()
+
+        pool = multiprocessing.Pool(workers, initializer=_init_worker,
+                                    initargs=(block.name, grid.width, grid.height, layout, options))
+        mapper = pool.imap if ordered else pool.imap_unordered
+        for result in mapper(_worker_search, pairs, chunksize):
+            yield result
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+        block.close()
+        block.unlink()
+
+def _search_pair(grid, pair, options):
+    (start_x, start_y), (end_x, end_y) = pair
+    try:
+        return pair, jps(grid, start_x, start_y, end_x, end_y, **options)
+    except ValueError:
+        return pair, []
+
+# The grid that each of jps_many's worker processes searches, attached to the shared memory block.
+_worker = {}
+
+def _init_worker(block_name, width, height, layout, options):
+    from multiprocessing import shared_memory
+    block = shared_memory.SharedMemory(name=block_name)  # the pool shares the parent's resource tracker, so this doesn't take ownership
+    has_tables, component_count, landmark_count = layout
+    size = width * height
+    flat = block.buf[size + (-size % 4):].cast('i')
+    offset = 0
+
+    def section(length):
+        nonlocal offset
+        start, offset = offset, offset + length
+        return flat[start:start + length]
+
+    tables = [section(size) for d in DIRECTIONS] if has_tables else None
+    grid = Grid.from_buffer(block.buf, width, height, tables)
+    if component_count is not None:
+        grid.components = section(size)
+        grid.component_count = component_count
+    if landmark_count is not None:
+        cells = section(landmark_count)
+        grid.landmarks = [(cells[k], section(size)) for k in range(landmark_count)]
+    _worker['block'] = block
+    _worker['grid'] = grid
+    _worker['options'] = options
+
+def _init_file_worker(path, options):
+    _worker['grid'] = Grid.load(path)
+    _worker['options'] = options
+
+def _worker_search(pair):
+    return _search_pair(_worker['grid'], pair, _worker['options'])
+
+def repair_path(grid, path, **options):
+    """
+    Fix a path after obstacles were added to the grid, e.g. with Grid.apply_edits(...).
+    The path is kept up to the last jump point before the first blocked cell, and only the rest is searched again.
+    The result is a valid path, but may be longer than a fresh search from the start would give.
+
+    Parameters
+    grid    - the Grid the path was found on, after the edits
+    path    - a list of jump points from jps(...)
+    options - passed on to jps(...)
+
+    Return
+    a list of jump points from the same start to the same end. path itself if it isn't blocked.
+    Raises ValueError like jps(...) if there is no path any more.
+    """
+    for k in range(len(path) - 1):
+        if not all(grid.is_walkable(x, y) for x, y in get_full_path(path[k:k + 2])):
+            (start_x, start_y), (end_x, end_y) = path[k], path[-1]
+            return path[:k] + jps(grid, start_x, start_y, end_x, end_y, **options)
+    if path and not grid.is_walkable(*path[0]):
+        raise ValueError("No path exists: the start node is not walkable")
+    return path
 
 def _signum(n):
     if n > 0: return 1
     elif n < 0: return -1
     else: return 0
 
-def get_full_path(path):
+def get_full_path(path, output='list'):
     """
     Generates the full path from a list of jump points. Assumes that you moved in only one direction between
     jump points.
 
     Parameters
-    path - a path generated by get_path
+    path   - a path generated by get_path, or an hpa.AbstractPath, which is refined into jump points first
+    output - 'list' for a list of every cell.
+             'array' for the same cells as an N x 2 numpy int array, built without a tuple per cell. Requires numpy.
+             'runs' for a list of straight runs (x, y, dx, dy, steps): from (x, y), take steps steps of (dx, dy).
+             Runs in the same direction are merged.
+             To walk a long path cell by cell without storing it, use iter_full_path(...) instead.
 
     Return
-    a list of 2-tuples (coordinates) starting from the start node and finishing at the end node.
+    a list of 2-tuples (coordinates) starting from the start node and finishing at the end node,
+    or the numpy array or list of runs, depending on output.
     """
+    if output == 'list':
+        return list(iter_full_path(path))
+    if hasattr(path, 'refine'):
+        path = path.refine()
+
+    if output == 'runs':
+        result = []
+        for (x, y), (end_x, end_y) in zip(path, path[1:]):
+            dx, dy = _signum(end_x - x), _signum(end_y - y)
+            steps = max(abs(end_x - x), abs(end_y - y))
+            if steps == 0:
+                continue
+            if result and result[-1][2:4] == (dx, dy):
+                run = result[-1]
+                result[-1] = run[:4] + (run[4] + steps,)
+            else:
+                result.append((x, y, dx, dy, steps))
+        return result
+
+    if output == 'array':
+        import numpy as np
+        if len(path) == 0:
+            return np.zeros((0, 2), dtype=np.int32)
+        points = np.array(path, dtype=np.int32).reshape(-1, 2)
+        deltas = np.diff(points, axis=0)
+        steps = np.abs(deltas).max(axis=1)
+        result = np.empty((1 + steps.sum(), 2), dtype=np.int32)
+        result[0] = points[0]
+        result[1:] = points[0] + np.cumsum(np.repeat(np.sign(deltas), steps, axis=0), axis=0)
+        return result
+
+    raise ValueError("Unknown output: {}".format(output))
+
+def iter_full_path(path):
+    """
+    Like get_full_path(...), but yields the cells one at a time, as they're needed.
+
+    Parameters
+    path - a path generated by get_path, or an hpa.AbstractPath, which is refined into jump points first
+
+    Return
+    a generator of 2-tuples (coordinates) from the start node to the end node.
+    """
+    if hasattr(path, 'refine'):
+        path = path.refine()
+    if len(path) == 0:
+        return
 
-    if path == []:
-        return []
-    
     cur_x, cur_y = path[0]
-    result = [(cur_x, cur_y)]
-    for i in range(len(path) - 1):
-        while cur_x != path[i + 1][0] or cur_y != path[i + 1][1]:
-            cur_x += _signum(path[i + 1][0] - path[i][0])
-            cur_y += _signum(path[i + 1][1] - path[i][1])
-            result.append((cur_x, cur_y))
+    yield cur_x, cur_y
+    for end_x, end_y in path[1:]:
+        dx, dy = _signum(end_x - cur_x), _signum(end_y - cur_y)
+        for i in range(max(abs(end_x - cur_x), abs(end_y - cur_y))):
+            cur_x += dx
+            cur_y += dy
+            yield cur_x, cur_y
+
+def _jump_points(cells):
+    """
+    The jump points of a full path (a list of adjacent cells, as from get_full_path): its ends, and every cell where it turns.
+    """
+    if len(cells) <= 2:
+        return list(cells)
+    result = [cells[0]]
+    for i in range(1, len(cells) - 1):
+        if (cells[i][0] - cells[i - 1][0], cells[i][1] - cells[i - 1][1]) != (cells[i + 1][0] - cells[i][0], cells[i + 1][1] - cells[i][1]):
+            result.append(cells[i])
+    result.append(cells[-1])
+    return result
+
+def percentiles(values, points=(50, 90, 99)):
+    """
+    Summarize a list of latencies (or any numbers) as an OrderedDict of the given percentiles, the max and the mean,
+    keyed 'p50', 'p90', ..., 'max', 'mean'. Used by the benchmark and the query server's stats.
+    """
+    values = sorted(values)
+    result = OrderedDict(('p{}'.format(p), values[min(len(values) - 1, int(len(values) * p / 100.0))]) for p in points)
+    result['max'] = values[-1]
+    result['mean'] = sum(values) / len(values)
     return result
 
 def drawGrid (field):
@@ -373,18 +2511,85 @@ def drawGrid (field):
                 print ("{:<3}".format(j), end=" ") 
         print("")
 
-def draw_jps(field, path, background=None):
+def render_search(field, path=(), tracer=None, scale=3, heatmap=False):
     """
-    Draw the output of the latest JPS search
+    Draw a field, the cells a search touched and its path into an RGBA image, all at once with array operations
+    instead of a rectangle per cell. Blit it with pygame.surfarray, as draw_jps(...) does, or write it to a PNG
+    with save_image(...) without opening a window. Requires numpy.
+
+    Parameters
+    field   - 2d array as made by generate_field(...), or a Grid
+    path    - the cells to mark as the path: a full path from get_full_path(...), or just the jump points
+    tracer  - optionally, the SearchTracer that was passed to jps(...), to show the expanded and scanned cells
+    scale   - the width and height of each cell in pixels
+    heatmap - if true, colour the expanded cells by how many times they were expanded, from dark cyan for once to
+              yellow for the most, instead of all the same. Useful with a tracer passed to many searches.
+
+    Return
+    a numpy uint8 array of shape (width * scale, height * scale, 4), indexed [x][y] like the field and surfarray
+    """
+    import numpy as np
+    grid = field if isinstance(field, Grid) else Grid(field)
+    walkable = np.frombuffer(bytes(grid.walkable), dtype=np.uint8).reshape(grid.width, grid.height).astype(bool)
+
+    cells = np.empty((grid.width, grid.height, 4), dtype=np.uint8)
+    cells[walkable] = (0, 255, 0, 100)      # valid path cells are green
+    cells[~walkable] = (255, 0, 0, 100)     # obstacles are red
+    if tracer is not None:
+        if tracer.visited_cells:
+            xs, ys = np.array(list(tracer.visited_cells)).T
+            cells[xs, ys] = (100, 50, 50, 160)    # scanned cells are brown
+        if heatmap and tracer.expansion_counts is not None and len(tracer.expansion_counts) == grid.width * grid.height:
+            counts = np.frombuffer(tracer.expansion_counts, dtype=np.uint32).reshape(grid.width, grid.height)
+            expanded = counts > 0
+            if expanded.any():
+                heat = np.log1p(counts[expanded]) / np.log1p(counts.max())
+                cells[expanded] = np.stack([heat * 255, 100 + heat * 155, 100 * (1 - heat), np.full(heat.shape, 255)], 1)
+        elif tracer.expanded_cells:
+            xs, ys = np.array(list(tracer.expanded_cells)).T
+            cells[xs, ys] = (0, 100, 100, 255)    # expanded cells are periwinkle
+
+    image = cells.repeat(scale, 0).repeat(scale, 1)
+    if len(path):
+        # the path is magenta, inset by a pixel so the cells under it still show
+        inset = 1 if scale > 2 else 0
+        xs, ys = np.asarray(path, dtype=np.intp).T * scale
+        offsets = np.arange(inset, scale)
+        image[(xs[:, None, None] + offsets[None, :, None]), (ys[:, None, None] + offsets[None, None, :])] = (255, 0, 255, 255)
+    return image
+
+def save_image(image, filename):
+    """
+    Write an RGBA image from render_search(...) to a file, e.g. a PNG, without opening a window.
+    Uses pygame if it's installed, and falls back to Pillow.
+    """
+    try:
+        import pygame
+    except ImportError:
+        from PIL import Image
+        Image.fromarray(image.transpose(1, 0, 2).copy(), 'RGBA').save(filename)
+        return
+    pygame.image.save(_image_surface(pygame, image), filename)
+
+def _image_surface(pygame, image):
+    """ A pygame surface with the pixels of an RGBA image from render_search(...) """
+    surface = pygame.Surface(image.shape[:2], flags=pygame.SRCALPHA)
+    pygame.surfarray.pixels3d(surface)[...] = image[:, :, :3]
+    pygame.surfarray.pixels_alpha(surface)[...] = image[:, :, 3]
+    return surface
+
+def draw_jps(field, path, background=None, tracer=None):
+    """
+    Draw the output of a JPS search in a window that can be scrolled with the arrow keys. Requires pygame and numpy.
 
     Background: a filename
+    tracer: the SearchTracer that was passed to jps(...), to show the expanded and scanned cells
     """
     SCROLL_SPEED = 2
     import pygame
     pygame.init()
     window = pygame.display.set_mode ((800, 600))
-    main_surface = pygame.Surface ((len(field) * 3, len(field[0]) * 3), flags=pygame.SRCALPHA)
-    main_surface.fill((0, 0, 0, 0))
+    main_surface = _image_surface(pygame, render_search(field, path, tracer))
 
     black_surface = pygame.Surface ((800, 600))
     black_surface.fill(0x000000)
@@ -392,21 +2597,6 @@ def draw_jps(field, path, background=None):
         background = pygame.image.load(background)
         background = pygame.transform.scale(background, (background.get_width() * 3, background.get_height() * 3))
 
-    for i in range(len(field)):
-        for j in range(len(field[i])):
-            if field[i][j] != OBSTACLE:
-                pygame.draw.rect(main_surface, (0, 255, 0, 100), (i * 3, j * 3, 3, 3)) #valid path cells are green 
-            else:
-                pygame.draw.rect(main_surface, (255, 0, 0, 100), (i * 3, j * 3, 3, 3)) #obstacles are red 
-
-##            if visited[i][j]:
-##                pygame.draw.rect(main_surface, (100, 50, 50, 100), (i * 3, j * 3, 3, 3))  # this could draw the visited cells, but it messes up the transparencies
-                
-            if expanded[i][j]:
-                pygame.draw.rect(main_surface, (0, 100, 100, 255), (i * 3, j * 3, 3, 3))   #expanded cells are periwinkle
-    for i in path:
-        pygame.draw.rect(main_surface, (255, 0, 255, 255), (i[0] * 3 + 1, i[1] * 3 + 1, 2, 2))  # path is magenta
-
     offset_x, offset_y = 0, 0
     while(True):
         #handle events
@@ -435,7 +2625,7 @@ def draw_jps(field, path, background=None):
         window.blit(main_surface, (offset_x, offset_y))
         pygame.display.flip()
 
-# Turn visual and debug modes on/ off
+# Turn visual and debug modes on/ off. The test scripts read these to decide whether to draw and profile.
 def set_visual(val):
     global VISUAL
     VISUAL = val
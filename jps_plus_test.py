@@ -0,0 +1,21 @@
+# JPS+ test: precompute jump distances once, then compare against the scanning search. Needs numpy.
+from jps import *
+import random, time
+
+set_visual(False)
+
+raw_field = [[random.randint(0, 100) for i in range(150)] for j in range(200)]
+field = generate_field(raw_field, (lambda cell: cell > 5), True)
+field[1][1] = UNINITIALIZED
+field[198][148] = UNINITIALIZED
+grid = Grid(field)
+
+try:
+    print("preprocessing:", grid.preprocess_jump_distances())
+except ImportError as err:
+    print("You don't have numpy. Cannot run the JPS+ test. ", err)
+else:
+    for mode in ('scan', 'jps+'):
+        t = time.time()
+        path = get_full_path(jps(grid, 1, 1, 198, 148, mode=mode))
+        print(mode, "took", time.time() - t, "for a path of", len(path) - 1, "steps")
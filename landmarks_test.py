@@ -0,0 +1,43 @@
+# Landmark (ALT) heuristics: fewer jump points expanded on a maze, with the same path lengths
+from jps import *
+import random, time
+
+set_visual(False)
+random.seed(10)
+
+# a maze of corridors 3 cells wide, carved by a random depth-first walk
+cells = 100
+field = [[OBSTACLE] * (cells * 4 + 1) for x in range(cells * 4 + 1)]
+stack, seen = [(0, 0)], set([(0, 0)])
+while stack:
+    cx, cy = stack[-1]
+    options = [(cx + dx, cy + dy) for dx, dy in DIRECTIONS[:4]
+               if 0 <= cx + dx < cells and 0 <= cy + dy < cells and (cx + dx, cy + dy) not in seen]
+    if not options:
+        stack.pop()
+        continue
+    nx, ny = random.choice(options)
+    seen.add((nx, ny))
+    stack.append((nx, ny))
+    for x in range(min(cx, nx) * 4 + 1, max(cx, nx) * 4 + 4):
+        for y in range(min(cy, ny) * 4 + 1, max(cy, ny) * 4 + 4):
+            field[x][y] = UNINITIALIZED
+
+plain, grid = Grid(field), Grid(field)
+try:
+    print("choosing landmarks:", grid.preprocess_landmarks(8))
+except ImportError as err:
+    print("You don't have numpy. Cannot choose landmarks. ", err)
+
+walkable = [plain.coords(i) for i in range(plain.width * plain.height) if plain.walkable[i]]
+queries = [random.choice(walkable) + random.choice(walkable) for i in range(20)]
+lengths = {}
+for name, g in (("chebyshev", plain), ("landmarks", grid)):
+    tracer = SearchTracer()
+    t = time.time()
+    lengths[name] = [len(get_full_path(jps(g, *q))) for q in queries]
+    seconds = time.time() - t
+    for q in queries:
+        jps(g, *q, tracer=tracer)
+    print(name, "- %.3f seconds," % seconds, tracer.expanded, "jump points expanded")
+assert lengths["chebyshev"] == lengths["landmarks"]
@@ -6,6 +6,7 @@ set_visual(True)
 # Image test to load a map from an image
 m = load_obstacle_image('obstacle map.png', 0xff0000)
 print("loaded image")
-path = get_full_path(jps(m, 40, 20, 607, 310))  # calculate a path from (40, 20) to (607, 310). 
+tracer = SearchTracer()
+path = get_full_path(jps(m, 40, 20, 607, 310, tracer=tracer))  # calculate a path from (40, 20) to (607, 310). 
 print("calculated shortest path")
-draw_jps(m, path, 'obstacle map.png')
+draw_jps(m, path, 'obstacle map.png', tracer)
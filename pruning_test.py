@@ -0,0 +1,32 @@
+# Compare how many jump points are expanded with and without direction-aware pruning,
+# on random fields like the ones in visual_test.py.
+# ('scan', False) is the original search. ('jps+', False) is A* over the same jump points as ('jps+', True),
+# without pruning, and needs numpy.
+import jps
+import random
+
+DENSITY = 5  # Percentage of the field that is filled.
+TRIALS = 10
+SEARCHES = [('scan', False), ('scan', True), ('jps+', False), ('jps+', True)]
+
+totals = dict((search, [0, 0]) for search in SEARCHES)
+for trial in range(TRIALS):
+    raw_field = [[random.randint(0, 100) for i in range(150)] for j in range(200)]
+    field = jps.generate_field(raw_field, (lambda cell: True if cell > DENSITY else False), True)
+    field[1][1] = jps.UNINITIALIZED  # guarantee that the end is reachable
+    field[198][148] = jps.UNINITIALIZED
+    grid = jps.Grid(field)
+
+    for mode, prune in SEARCHES:
+        try:
+            tracer = jps.SearchTracer()
+            path = jps.get_full_path(jps.jps(grid, 1, 1, 198, 148, mode=mode, prune=prune, tracer=tracer))
+        except ImportError:
+            continue  # no numpy for jps+
+        except ValueError:
+            break
+        totals[mode, prune][0] += tracer.expanded
+        totals[mode, prune][1] += len(path) - 1
+
+for mode, prune in SEARCHES:
+    print("mode =", mode, " prune =", prune, " expanded:", totals[mode, prune][0], " total path length:", totals[mode, prune][1])
@@ -0,0 +1,39 @@
+# Compare the binary heap and the bucket queue on a large random field
+import jps
+import random, time
+
+DENSITY = 5  # Percentage of the field that is filled.
+WIDTH, HEIGHT = 800, 600
+QUERIES = 20
+
+raw_field = [[random.randint(0, 100) for i in range(HEIGHT)] for j in range(WIDTH)]
+grid = jps.Grid(jps.generate_field(raw_field, (lambda cell: cell > DENSITY), True))
+queries = []
+while len(queries) < QUERIES:
+    query = (random.randint(1, WIDTH - 2), random.randint(1, HEIGHT - 2), random.randint(1, WIDTH - 2), random.randint(1, HEIGHT - 2))
+    if grid.is_walkable(*query[:2]) and grid.is_walkable(*query[2:]):
+        queries.append(query)
+
+try:
+    grid.preprocess_jump_distances()
+except ImportError:
+    pass
+
+for mode in ('scan', 'jps+'):
+    for queue in ('heap', 'bucket'):
+        tracer = jps.SearchTracer()
+        seconds = 0
+        for query in queries:
+            try:
+                # time the search without a tracer, then run it again to count what it does
+                t = time.time()
+                jps.jps(grid, *query, mode=mode, queue=queue)
+                seconds += time.time() - t
+            except ImportError:
+                break  # no numpy for jps+
+            except ValueError:
+                seconds += time.time() - t
+                continue
+            jps.jps(grid, *query, mode=mode, queue=queue, tracer=tracer)
+        print("mode =", mode, " queue =", queue, " took", seconds, " expanded:", tracer.expanded,
+              " pushes:", tracer.pushes, " pops:", tracer.pops)
@@ -0,0 +1,285 @@
+# A long-running query server: load named maps once, then answer jps queries sent as JSON lines
+#
+#   python server.py --map city=maps/city.grid --map office=office.png              read queries from stdin
+#   python server.py --map city=maps/city.grid --unix /tmp/jps.sock --workers 4      or from a Unix socket
+#   python server.py --map city=maps/city.grid --tcp 127.0.0.1:7070                  or from a TCP socket
+#
+# Each line is a query like
+#   {"id": 1, "map": "city", "start": [10, 20], "end": [300, 40], "options": {"mode": "jps+"}, "full": false}
+# and gets one line back when its search finishes, so replies can come back in a different order (match them by id):
+#   {"id": 1, "path": [[10, 20], ...], "latency_ms": {"search": 1.2, "total": 1.9}}
+#   {"id": 1, "error": "No path is found", "latency_ms": {"search": 0.4, "total": 0.6}}
+# options are passed on to jps(...), and with "full": true the path has every cell instead of the jump points.
+# {"op": "stats"} gets the counters and latency percentiles of the whole server back instead.
+#
+# Maps are compiled map files (see Grid.save) or images with white obstacles (see load_obstacle_image), which are
+# compiled to a temporary file at startup. Every worker process memory-maps the same files, so the grids are
+# loaded once and shared, and each worker keeps a path cache for each of them. At most --max-pending queries are
+# searched at once. Past that the server stops reading until some finish, so a client that sends queries faster
+# than they can be answered is slowed down instead of filling up the server's memory. A query that isn't answered
+# within --timeout seconds (say its worker was killed) gets an error reply and frees its place.
+
+from __future__ import print_function
+
+import argparse, itertools, json, multiprocessing, os, shutil, signal, socketserver, sys, tempfile, threading, time
+from collections import OrderedDict, deque
+
+from jps import *
+
+class QueryServer(object):
+    """
+    Answers queries on a set of named maps with a pool of worker processes. See the top of this file for the protocol.
+    One server can serve any number of connections at once: they share its workers and its limit on pending queries.
+
+    answered, errors - the number of queries that got a path, and that got an error
+    latencies        - the total latencies of the most recent queries, in milliseconds
+    """
+    def __init__(self, maps, workers=None, max_pending=256, cache_size=1024, timeout=60):
+        """
+        Parameters
+        maps        - a dict from map names to compiled map files or obstacle images
+        workers     - the number of worker processes. Defaults to the number of cores.
+        max_pending - the most queries that can be waiting for or in a search at once
+        cache_size  - how many paths each worker caches per map (see Grid.cache_paths), or 0 for none
+        timeout     - the seconds a query can wait for its search before it gets an error instead, or None for no limit
+        """
+        self.maps = OrderedDict()
+        self._compiled = None   # a directory of the maps compiled from images
+        for name, path in maps.items():
+            if not path.endswith('.grid'):
+                if self._compiled is None:
+                    self._compiled = tempfile.mkdtemp()
+                grid = Grid(load_obstacle_image(path))
+                grid.label_components()
+                path = os.path.join(self._compiled, name + '.grid')
+                grid.save(path)
+            Grid.load(path)   # fail now rather than in every worker
+            self.maps[name] = path
+
+        self.pool = multiprocessing.Pool(workers, initializer=_init_worker, initargs=(self.maps, cache_size))
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.answered = 0
+        self.errors = 0
+        self.latencies = deque(maxlen=10000)
+        self._pending = threading.BoundedSemaphore(max_pending)
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._started = time.time()
+
+    def serve(self, lines, write):
+        """
+        Answer the queries in lines, an iterable of JSON lines such as a file or socket, calling write(text) with
+        each reply. Return once lines runs out and every reply has been written.
+        """
+        write_lock = threading.Lock()
+        outstanding = threading.Condition()
+        counts = [0]   # queries of this connection in the pool
+        waiting = {}   # queries of this connection without a reply yet: number -> (deadline, query, received)
+        numbers = itertools.count()
+
+        def reply(message):
+            text = json.dumps(message) + '\n'
+            with write_lock:
+                write(text)
+
+        def settle(number, path, error, seconds):
+            # the first of the result, a failure or the timeout answers the query; later ones are ignored
+            with outstanding:
+                if number not in waiting:
+                    return
+                deadline, query, received = waiting.pop(number)
+            total = (time.perf_counter() - received) * 1000
+            with self._lock:
+                self._in_flight -= 1
+                if error is None:
+                    self.answered += 1
+                else:
+                    self.errors += 1
+                self.latencies.append(total)
+            self._pending.release()
+            message = OrderedDict([('id', query.get('id'))])
+            if error is None:
+                message['path'] = path
+            else:
+                message['error'] = error
+            message['latency_ms'] = OrderedDict([('search', seconds * 1000), ('total', total)] if seconds is not None
+                                                else [('total', total)])
+            try:
+                reply(message)
+            except Exception:
+                # the client has gone (e.g. BrokenPipeError). This runs in the pool's result thread, which
+                # mustn't die, so the reply is dropped and the query is counted as answered all the same.
+                pass
+            with outstanding:
+                counts[0] -= 1
+                outstanding.notify_all()
+
+        def expire():
+            # a worker that dies mid-search never reports back, so give up on queries past their deadline
+            now = time.perf_counter()
+            with outstanding:
+                overdue = [number for number, (deadline, query, received) in waiting.items() if deadline <= now]
+            for number in overdue:
+                settle(number, None, "Timed out after {} seconds".format(self.timeout), None)
+
+        # a watchdog gives up on overdue queries even while the reader is waiting for the client's next line
+        done = threading.Event()
+        if self.timeout is not None:
+            def watch():
+                while not done.wait(min(self.timeout, 1.0)):
+                    expire()
+            threading.Thread(target=watch, daemon=True).start()
+
+        try:
+            for line in lines:
+                if not line.strip():
+                    continue
+                received = time.perf_counter()
+                query = None
+                try:
+                    query = json.loads(line)
+                    if query.get('op') == 'stats':
+                        reply(dict(self.stats(), id=query.get('id')))
+                        continue
+                    if query.get('map') not in self.maps:
+                        raise ValueError("Unknown map: {}".format(query.get('map')))
+                    (start_x, start_y), (end_x, end_y) = query['start'], query['end']
+                    args = (query['map'], int(start_x), int(start_y), int(end_x), int(end_y),
+                            dict(query.get('options') or {}), bool(query.get('full')))
+                except (ValueError, KeyError, TypeError, AttributeError) as err:
+                    with self._lock:
+                        self.errors += 1
+                    reply({'id': query.get('id') if isinstance(query, dict) else None, 'error': "Bad query: {}".format(err)})
+                    continue
+
+                self._pending.acquire()   # backpressure: don't read any more until a search finishes
+                with self._lock:
+                    self._in_flight += 1
+                number = next(numbers)
+                with outstanding:
+                    counts[0] += 1
+                    deadline = received + self.timeout if self.timeout is not None else float('inf')
+                    waiting[number] = (deadline, query, received)
+
+                def finished(result, number=number):
+                    settle(number, *result)
+
+                def failed(err, number=number):
+                    # the search raised something _answer doesn't catch, or its result couldn't be sent back
+                    settle(number, None, "{}: {}".format(type(err).__name__, err), None)
+
+                self.pool.apply_async(_answer, args, callback=finished, error_callback=failed)
+
+            with outstanding:
+                while counts[0]:
+                    outstanding.wait()
+        finally:
+            done.set()
+
+    def stats(self):
+        """ The server's counters and latency percentiles, as a dict for the JSON. """
+        with self._lock:
+            result = OrderedDict([('uptime_s', time.time() - self._started), ('maps', list(self.maps)),
+                                  ('answered', self.answered), ('errors', self.errors),
+                                  ('in_flight', self._in_flight), ('max_pending', self.max_pending)])
+            if self.latencies:
+                result['latency_ms'] = percentiles(self.latencies)
+        return result
+
+    def close(self):
+        self.pool.terminate()
+        self.pool.join()
+        if self._compiled is not None:
+            shutil.rmtree(self._compiled, ignore_errors=True)
+
+def serve_socket(server, address):
+    """
+    Serve connections on address until interrupted: a path for a Unix socket, or a (host, port) tuple for TCP.
+    Each connection is served by its own thread.
+    """
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            server.serve(self.rfile, lambda text: self.wfile.write(text.encode('utf-8')))
+
+    if isinstance(address, tuple):
+        listener_class = socketserver.ThreadingTCPServer
+    else:
+        listener_class = socketserver.ThreadingUnixStreamServer
+        if os.path.exists(address):
+            os.remove(address)
+    listener_class.daemon_threads = True
+    listener_class.allow_reuse_address = True
+    listener = listener_class(address, Handler)
+    try:
+        listener.serve_forever()
+    finally:
+        listener.server_close()
+        if not isinstance(address, tuple):
+            os.remove(address)
+
+# The grids that each worker process searches, memory-mapped from the compiled map files.
+_grids = {}
+
+def _init_worker(maps, cache_size):
+    for name, path in maps.items():
+        _grids[name] = Grid.load(path)
+        if cache_size:
+            _grids[name].cache_paths(cache_size)
+
+def _answer(name, start_x, start_y, end_x, end_y, options, full):
+    """ Run one query in a worker. Return (path, error message or None, seconds spent searching). """
+    t = time.perf_counter()
+    grid = _grids[name]
+    try:
+        for x, y in ((start_x, start_y), (end_x, end_y)):
+            if not (0 <= x < grid.width and 0 <= y < grid.height):
+                raise ValueError("({}, {}) is off the map".format(x, y))
+        path = jps(grid, start_x, start_y, end_x, end_y, **options)
+        if full:
+            path = get_full_path(path)
+        error = None
+    except ValueError as err:
+        path, error = None, str(err)
+    except Exception as err:   # e.g. coordinates off the map, or an unknown option. The server keeps going.
+        path, error = None, "{}: {}".format(type(err).__name__, err)
+    return path, error, time.perf_counter() - t
+
+if __name__ == '__main__':
+    set_visual(False)
+    parser = argparse.ArgumentParser(description="Answer jps queries sent as JSON lines, on maps loaded once.")
+    parser.add_argument('--map', action='append', default=[], metavar='NAME=PATH', required=True,
+                        help="a map to serve: a compiled .grid file, or an image with white obstacles. Can be repeated.")
+    parser.add_argument('--unix', metavar='PATH', help="listen on a Unix socket instead of reading stdin")
+    parser.add_argument('--tcp', metavar='HOST:PORT', help="listen on a TCP socket instead of reading stdin")
+    parser.add_argument('--workers', type=int, help="the number of worker processes (default: the number of cores)")
+    parser.add_argument('--max-pending', type=int, default=256, help="the most queries searched at once")
+    parser.add_argument('--cache-size', type=int, default=1024, help="paths cached per map by each worker, 0 for none")
+    parser.add_argument('--timeout', type=float, default=60, help="seconds before a query gives up, 0 for no limit")
+    args = parser.parse_args()
+
+    maps = OrderedDict()
+    for entry in args.map:
+        name, sep, path = entry.partition('=')
+        if not sep:
+            parser.error("--map needs NAME=PATH, not " + entry)
+        maps[name] = path
+
+    server = QueryServer(maps, args.workers, args.max_pending, args.cache_size, args.timeout or None)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))   # clean up the same way as after Ctrl-C
+    print("serving", ', '.join(maps), "with", args.workers or multiprocessing.cpu_count(), "workers", file=sys.stderr)
+    try:
+        if args.unix:
+            serve_socket(server, args.unix)
+        elif args.tcp:
+            host, sep, port = args.tcp.rpartition(':')
+            serve_socket(server, (host or '127.0.0.1', int(port)))
+        else:
+            def write(text):
+                sys.stdout.write(text)
+                sys.stdout.flush()
+            server.serve(sys.stdin, write)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
@@ -0,0 +1,51 @@
+# The query server: preload a map, then answer JSON lines queries with a pool of workers
+from jps import *
+from server import QueryServer
+import json, os, random, shutil, tempfile, time
+
+set_visual(False)
+
+if __name__ == '__main__':
+    random.seed(12)
+    raw_field = [[random.randint(0, 100) for i in range(300)] for j in range(400)]
+    grid = Grid(generate_field(raw_field, (lambda cell: cell > 20), True))
+    grid.label_components()
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'random.grid')
+    grid.save(path)
+
+    cells = [grid.coords(i) for i in range(grid.width * grid.height) if grid.walkable[i]]
+    queries = [json.dumps({'id': i, 'map': 'random', 'start': random.choice(cells), 'end': random.choice(cells)})
+               for i in range(200)]
+    queries.append(json.dumps({'id': 'bad', 'map': 'nowhere', 'start': [1, 1], 'end': [2, 2]}))
+    queries.append(json.dumps({'op': 'stats', 'id': 'stats'}))
+
+    server = QueryServer({'random': path}, workers=2, max_pending=8)
+    replies = []
+    try:
+        t = time.time()
+        server.serve(queries, replies.append)
+        print(len(queries), "queries answered in", time.time() - t, "seconds")
+
+        # a client that hangs up with queries in flight doesn't take the server down for the next one
+        def hung_up(text):
+            raise BrokenPipeError("the client went away")
+        server.serve(queries[:20], hung_up)
+        later = []
+        server.serve(queries[:20], later.append)
+        assert len(later) == 20 and not any('Timed out' in reply for reply in later)
+    finally:
+        server.close()
+        shutil.rmtree(directory)
+
+    replies = dict((reply['id'], reply) for reply in map(json.loads, replies))
+    print("bad query:", replies['bad']['error'])
+    print("stats after the first 200:", replies['stats'])
+    for i in range(200):
+        query = json.loads(queries[i])
+        try:
+            expected = len(get_full_path(jps(grid, *(query['start'] + query['end']))))
+        except ValueError:
+            expected = None
+        reply = replies[i]
+        assert (len(get_full_path([tuple(cell) for cell in reply['path']])) if 'path' in reply else None) == expected
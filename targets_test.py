@@ -0,0 +1,48 @@
+# One-to-many searches: paths to many destinations, or to the nearest one, from a single search
+from jps import *
+import random, time
+
+set_visual(False)
+random.seed(3)
+
+raw_field = [[random.randint(0, 100) for i in range(300)] for j in range(400)]
+field = generate_field(raw_field, (lambda cell: cell > 20), True)
+field[20][20] = UNINITIALIZED
+grid = Grid(field)
+
+def separately(field, target):
+    try:
+        return jps(field, 20, 20, *target)
+    except ValueError:
+        return []
+
+def compare(name, goals):
+    for label, f in (("a plain field", field), ("a Grid", grid)):
+        t = time.time()
+        paths = dict((target, separately(f, target)) for target in goals)
+        print(name, "-", len(goals), "separate searches on", label, "took", time.time() - t)
+    t = time.time()
+    together = jps_targets(grid, 20, 20, goals)
+    print(name, "- one search to all of them took", time.time() - t)
+    assert all(len(get_full_path(together[g])) == len(get_full_path(paths[g])) for g in goals)
+    t = time.time()
+    together = jps_targets(grid, 20, 20, goals, mode='bitset')
+    print(name, "- one bitset search to all of them took", time.time() - t)
+    assert all(len(get_full_path(together[g])) == len(get_full_path(paths[g])) for g in goals)
+
+cells = [grid.coords(i) for i in range(grid.width * grid.height) if grid.walkable[i]]
+compare("spread out", random.sample(cells, 40))
+compare("in one area", random.sample([(x, y) for x, y in cells if x > 300 and y > 200], 40))
+
+depots = random.sample(cells, 8)
+t = time.time()
+best = min((len(get_full_path(separately(grid, depot))), depot) for depot in depots if separately(grid, depot))
+print("nearest of 8 depots by separate searches took", time.time() - t)
+
+t = time.time()
+depot, path = jps_nearest(grid, 20, 20, depots)
+print("jps_nearest took", time.time() - t, "and found", depot, "at", len(get_full_path(path)) - 1, "steps")
+assert len(get_full_path(path)) == best[0]
+
+depot, path = jps_nearest(grid, 20, 20, depots, mode='bitset')
+assert len(get_full_path(path)) == best[0]
@@ -23,7 +23,8 @@ if DEBUG:
     t = time.time()
     pr.enable() # start the profiler
     
-path = jps(field, 1, 1, 198, 148)
+tracer = SearchTracer()
+path = jps(field, 1, 1, 198, 148, tracer=tracer)
 path = get_full_path(path)
 
 if DEBUG:
@@ -31,11 +32,12 @@ if DEBUG:
     print("took ", (time.time() - t), " to do search")
     t = time.time()
     print("full long path: ", path)
+    print("expanded", tracer.expanded, "jump points and scanned", tracer.scanned, "cells. times:", tracer.times)
     pr.print_stats() 
 
 if VISUAL:
     try:
-        draw_jps(field, path)
+        draw_jps(field, path, tracer=tracer)
     except ImportError as err:
         print("You don't have pygame. Cannot display large test. ", err)
 else: